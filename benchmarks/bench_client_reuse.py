@@ -0,0 +1,47 @@
+# Per-task overhead of a fresh genai client per call versus one shared client.
+# Run from the repository root: python -m benchmarks.bench_client_reuse
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import StubServer
+from config.constants import LLM_CONCURRENCY
+from llm.Gemini.provider import GeminiProvider
+
+
+class FreshClientProvider(GeminiProvider):
+    # Reproduces the old behaviour of building a genai.Client for every task.
+    # The client is parked on the thread so it is not closed mid-request.
+    local=threading.local()
+
+    @property
+    def client(self):
+        self.local.client=self.create_client()
+        return self.local.client
+
+
+def run(provider,tasks,workers):
+    start=time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda task: provider.get_category(task,'stub-model'),tasks))
+    return time.perf_counter()-start
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description="Benchmark genai client reuse against a local stub server")
+    parser.add_argument('--tasks',type=int,default=500)
+    parser.add_argument('--workers',type=int,default=LLM_CONCURRENCY)
+    args=parser.parse_args()
+
+    tasks=[f'task {i}' for i in range(args.tasks)]
+    with StubServer() as stub:
+        # Warm up imports so neither side pays them inside the timing
+        GeminiProvider('stub-key',base_url=stub.url).get_category('warmup','stub-model')
+        results={
+            'fresh client per task':run(FreshClientProvider('stub-key',base_url=stub.url),tasks,args.workers),
+            'shared client':run(GeminiProvider('stub-key',base_url=stub.url),tasks,args.workers),
+        }
+
+    for name,elapsed in results.items():
+        print(f'{name:<24} {elapsed:8.3f}s total  {elapsed/args.tasks*1000:8.3f} ms/task')
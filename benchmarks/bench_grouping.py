@@ -0,0 +1,92 @@
+# Compares the old ProcessPoolExecutor grouping in SaveUtils.save with the
+# in-process TaskGrouper backends. Run from the repository root:
+#   python -m benchmarks.bench_grouping --sizes 1000 10000 100000
+import time
+import random
+import argparse
+from datetime import datetime, MAXYEAR, date, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config.constants import DEFAULT_CATEGORIES,DIFFICULTIES
+from storage.grouping import TaskGrouper, np
+
+
+def legacy_process_list_name(args):
+    # SaveUtils.process_list_name as it was before the in-process engine
+    list_name, items = args
+    sorted_items = sorted(
+        items,
+        key=lambda x: (
+            datetime.strptime(x['completed'], '%d-%m-%Y')
+            if x['completed'] != 'Not complete'
+            else datetime(MAXYEAR, 12, 31)
+        )
+    )
+    grouped_by_date = {}
+    for x in sorted_items:
+        if x['completed'] != 'Not complete':
+            grouped_by_date.setdefault(x['completed'], []).append({
+                'title': x['title'],
+                'category': x['llm_output']['category'],
+                'difficulty': x['llm_output']['diificulty']
+            })
+    return {list_name: grouped_by_date}
+
+
+def legacy_save(response):
+    entries=[]
+    with ProcessPoolExecutor() as executor:
+        futures=[executor.submit(legacy_process_list_name,(name,items)) for name,items in response.items()]
+        for future in as_completed(futures):
+            entries.append(future.result())
+    return entries
+
+
+def synthetic_response(size,lists=4,days=3*365,seed=7):
+    rng=random.Random(seed)
+    start=date(2023,1,1)
+    response={}
+    for list_idx in range(lists):
+        items=[]
+        for i in range(size//lists):
+            done=rng.random()<0.9
+            items.append({
+                'title':f'task {list_idx}-{i}',
+                'status':'completed' if done else 'needsAction',
+                'completed':(start+timedelta(days=rng.randrange(days))).strftime('%d-%m-%Y') if done else 'Not complete',
+                'llm_output':{'category':rng.choice(DEFAULT_CATEGORIES),'diificulty':rng.choice(DIFFICULTIES)},
+            })
+        response[f'list {list_idx}']=items
+    return response
+
+
+def timed(fn,response,repeat):
+    best=float('inf')
+    for _ in range(repeat):
+        start=time.perf_counter()
+        fn(response)
+        best=min(best,time.perf_counter()-start)
+    return best
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description="Benchmark tracker grouping backends")
+    parser.add_argument('--sizes',type=int,nargs='+',default=[100,1000,10000,100000])
+    parser.add_argument('--repeat',type=int,default=3)
+    args=parser.parse_args()
+
+    backends={
+        'process pool (old)':legacy_save,
+        'in-process python':lambda response: [TaskGrouper.group_list(name,items,'python') for name,items in response.items()],
+    }
+    if np is not None:
+        backends['in-process numpy']=lambda response: [TaskGrouper.group_list(name,items,'numpy') for name,items in response.items()]
+
+    print(f"{'tasks':>8}  "+'  '.join(f'{name:>20}' for name in backends))
+    for size in args.sizes:
+        response=synthetic_response(size)
+        expected=sorted(legacy_save(response),key=lambda entry: next(iter(entry)))
+        for name,fn in backends.items():
+            if name!='process pool (old)':
+                assert sorted(fn(response),key=lambda entry: next(iter(entry)))==expected, name
+        print(f'{size:>8}  '+'  '.join(f'{timed(fn,response,args.repeat)*1000:>18.1f}ms' for fn in backends.values()))
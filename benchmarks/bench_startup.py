@@ -0,0 +1,67 @@
+# Import-time and wall-clock budgets for the cheap CLI commands.
+# Run from the repository root: python -m benchmarks.bench_startup
+# Exits non-zero when a command goes over its import budget.
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT=Path(__file__).resolve().parent.parent
+
+# Cumulative import time (ms) allowed per command, interpreter start-up excluded
+BUDGETS={
+    '--version':50,
+    '--list':150,
+}
+
+
+def import_time(stderr):
+    # -X importtime prints "import time: self | cumulative | name", top-level
+    # imports have no indentation before the name
+    total=0
+    modules=[]
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _,cumulative,name=line.split('|')
+        if name.startswith('  ') or name.strip()=='site':
+            continue
+        total+=int(cumulative)
+        modules.append((int(cumulative),name.strip()))
+    return total/1000,sorted(modules,reverse=True)[:5]
+
+
+def run(command,cwd,repeat):
+    best=float('inf')
+    for _ in range(repeat):
+        start=time.perf_counter()
+        result=subprocess.run([sys.executable,'-X','importtime',str(ROOT/'main.py'),command],cwd=cwd,capture_output=True,text=True,env={**os.environ,'PYTHONPATH':str(ROOT)})
+        best=min(best,time.perf_counter()-start)
+        if result.returncode!=0:
+            raise RuntimeError(f'{command} failed:\n{result.stderr[-2000:]}')
+    return best*1000,*import_time(result.stderr)
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description="Benchmark CLI start-up")
+    parser.add_argument('--repeat',type=int,default=5)
+    args=parser.parse_args()
+
+    over=[]
+    with tempfile.TemporaryDirectory() as cwd:
+        # --list only needs the local tracker, which lives under ./config
+        (Path(cwd)/'config').mkdir()
+        (Path(cwd)/'config'/'tracker.json').write_text(json.dumps({'lists':['Work']}))
+        for command,budget in BUDGETS.items():
+            wall,imports,slowest=run(command,cwd,args.repeat)
+            status='ok' if imports<=budget else 'OVER BUDGET'
+            print(f'{command:<10} wall {wall:7.1f}ms  imports {imports:7.1f}ms  budget {budget}ms  {status}')
+            for cumulative,name in slowest:
+                print(f'{"":<12}{cumulative/1000:7.1f}ms  {name}')
+            if imports>budget:
+                over.append(command)
+    sys.exit(1 if over else 0)
@@ -0,0 +1,80 @@
+# Peak RSS of the batch path (list_google_tasks + SaveUtils.save) versus the
+# streaming path (stream_google_tasks + per-page merges) on synthetic histories.
+# Each measurement runs in its own process. The tracker store is in memory on both
+# paths, so neither is bounded by the page size; what --stream drops is the fetched
+# and enriched history the default path holds before saving. Exits non-zero when the
+# streaming path grows further above its baseline than the default path does.
+# From the repository root:
+#   python -m benchmarks.bench_streaming_memory --sizes 10000 100000 1000000
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT=Path(__file__).resolve().parent.parent
+LISTS=4
+
+
+def measure(mode,size):
+    from benchmarks.fakes import FakeTasksService, FakeProvider, FakeTrackerProvider
+    from utils import SaveUtils
+
+    names=[f'list {idx}' for idx in range(LISTS)]
+    Path('config').mkdir()
+    Path('config/tracker.json').write_text(json.dumps({'lists':names}))
+    tasks_obj=FakeTrackerProvider(FakeTasksService({name:size//LISTS for name in names}))
+    provider=FakeProvider()
+    save_utils=SaveUtils()
+    baseline=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start=time.perf_counter()
+    if mode=='stream':
+        save_utils.refresh()
+        for list_name,page in tasks_obj.stream_google_tasks(set(names),provider,'fake-model',full_resync=True):
+            save_utils.merge_page(list_name,page)
+        save_utils.finish(watermarks=tasks_obj.watermarks)
+    else:
+        response=tasks_obj.list_google_tasks(set(names),provider,'fake-model',full_resync=True)
+        save_utils.save(response,watermarks=tasks_obj.watermarks)
+    elapsed=time.perf_counter()-start
+
+    peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale=1024 if sys.platform!='darwin' else 1024*1024
+    return {'mode':mode,'tasks':size,'seconds':round(elapsed,3),'peak_rss_mb':round(peak/scale,1),'baseline_rss_mb':round(baseline/scale,1),
+            'tracker_mb':round(os.path.getsize('config/tracker.json')/1024/1024,1)}
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description="Benchmark peak memory of batch versus streaming processing")
+    parser.add_argument('--sizes',type=int,nargs='+',default=[10000,100000])
+    parser.add_argument('--modes',nargs='+',default=['batch','stream'])
+    parser.add_argument('--worker',nargs=2,metavar=('MODE','SIZE'),help=argparse.SUPPRESS)
+    args=parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker[0],int(args.worker[1]))))
+        sys.exit(0)
+
+    print(f"{'tasks':>9}  {'mode':<7} {'seconds':>8} {'peak RSS':>10} {'baseline':>10} {'tracker.json':>13}")
+    over=False
+    for size in args.sizes:
+        growth={}
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as cwd:
+                output=subprocess.run(
+                    [sys.executable,'-m','benchmarks.bench_streaming_memory','--worker',mode,str(size)],
+                    cwd=cwd,capture_output=True,text=True,check=True,env={**os.environ,'PYTHONPATH':str(ROOT)}
+                ).stdout
+            result=json.loads(output.strip().splitlines()[-1])
+            print(f"{size:>9}  {mode:<7} {result['seconds']:>8.2f} {result['peak_rss_mb']:>8.1f}MB {result['baseline_rss_mb']:>8.1f}MB {result['tracker_mb']:>11.1f}MB")
+            growth[mode]=result['peak_rss_mb']-result['baseline_rss_mb']
+        if 'batch' in growth and 'stream' in growth and growth['stream']>growth['batch']:
+            print(f"{size:>9}  stream grew {growth['stream']:.1f}MB, more than the default path's {growth['batch']:.1f}MB")
+            over=True
+    sys.exit(1 if over else 0)
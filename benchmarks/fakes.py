@@ -0,0 +1,145 @@
+# In-process stand-ins for the external services, shared by the benchmarks
+import time
+import random
+import hashlib
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+
+from config.constants import DEFAULT_CATEGORIES,DIFFICULTIES,DEFAULT_BATCH_SIZE
+from storage.fake_firestore import FakeFirestore
+from tasks.getTasks import TrackerProvider
+
+EPOCH=datetime(2022,1,1,tzinfo=timezone.utc)
+
+
+class FakeRequest:
+    def __init__(self,response,latency=0.0):
+        self.response=response
+        self.latency=latency
+
+    def execute(self,*args,**kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.response()
+
+
+class FakeTaskLists:
+    def __init__(self,service):
+        self.service=service
+
+    def list(self,maxResults=1000,pageToken=None):
+        names=list(self.service.lists)
+        start=int(pageToken or 0)
+        def response():
+            items=[{'id':f'id-{idx}','title':name} for idx,name in enumerate(names[start:start+maxResults],start)]
+            result={'items':items}
+            if start+maxResults<len(names):
+                result['nextPageToken']=str(start+maxResults)
+            return result
+        return FakeRequest(response,self.service.latency)
+
+
+class FakeTasks:
+    def __init__(self,service):
+        self.service=service
+
+    def list(self,tasklist,showHidden=False,maxResults=20,pageToken=None,updatedMin=None):
+        service=self.service
+        name=list(service.lists)[int(tasklist.split('-')[1])]
+        size=service.lists[name]
+        # Task i was last updated i minutes after EPOCH, so updatedMin maps to a start index
+        first=0
+        if updatedMin:
+            first=max(0,int((datetime.strptime(updatedMin,'%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)-EPOCH).total_seconds()//60))
+        start=max(first,int(pageToken or 0))
+        def response():
+            end=min(size,start+maxResults)
+            result={'items':[service.task(name,idx) for idx in range(start,end)]}
+            if end<size:
+                result['nextPageToken']=str(end)
+            return result
+        return FakeRequest(response,service.latency)
+
+
+class FakeTasksService:
+    # Mimics build('tasks', 'v1'): tasks are generated on demand page by page,
+    # so a million-task history costs no memory until it is fetched
+    def __init__(self,lists,unique_titles=5000,completed_rate=0.9,days=3*365,latency=0.0):
+        self.lists=dict(lists)
+        self.unique_titles=unique_titles
+        self.completed_rate=completed_rate
+        self.days=days
+        self.latency=latency
+
+    def task(self,list_name,idx):
+        updated=EPOCH+timedelta(minutes=idx)
+        task={
+            'id':f'{list_name}-{idx}',
+            'title':f'{list_name} task {idx%self.unique_titles}',
+            'updated':updated.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'status':'needsAction',
+        }
+        if (idx*2654435761)%1000<self.completed_rate*1000:
+            completed=EPOCH+timedelta(days=idx*self.days//max(1,self.lists[list_name]))
+            task['status']='completed'
+            task['completed']=completed.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return task
+
+    def tasklists(self):
+        return FakeTaskLists(self)
+
+    def tasks(self):
+        return FakeTasks(self)
+
+
+class FakeAPIError(Exception):
+    def __init__(self,code):
+        super().__init__(f'{code} fake provider error')
+        self.code=code
+
+
+class FakeProvider:
+    # Stands in for GeminiProvider with configurable latency per request and error rate
+    def __init__(self,latency=0.0,error_rate=0.0,batch_size=DEFAULT_BATCH_SIZE,seed=0):
+        self.categories=DEFAULT_CATEGORIES
+        self.batch_size=batch_size
+        self.latency=latency
+        self.error_rate=error_rate
+        self.random=random.Random(seed)
+        self.requests=0
+
+    @staticmethod
+    def answer(task):
+        digest=int(hashlib.sha1(str(task).encode('utf-8')).hexdigest(),16)
+        return {'category':DEFAULT_CATEGORIES[digest%len(DEFAULT_CATEGORIES)],'diificulty':DIFFICULTIES[digest//7%len(DIFFICULTIES)]}
+
+    def request(self):
+        self.requests+=1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self.random.random()<self.error_rate:
+            raise FakeAPIError(self.random.choice([429,503]))
+
+    def get_category(self,task,model):
+        self.request()
+        return self.answer(task)
+
+    def get_categories(self,tasks,model):
+        self.request()
+        return [self.answer(task) for task in tasks]
+
+
+class FakeTrackerProvider(TrackerProvider):
+    # TrackerProvider wired to a FakeTasksService instead of OAuth and the Tasks API
+    def __init__(self,service,profile=None,cache=None):
+        super().__init__(profile,cache)
+        self.service=service
+
+    def get_service(self):
+        return self.service
+
+    def session(self):
+        return nullcontext()
+
+
+__all__=['FakeTasksService','FakeProvider','FakeAPIError','FakeTrackerProvider','FakeFirestore']
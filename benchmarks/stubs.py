@@ -0,0 +1,147 @@
+import re
+import json
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.constants import DEFAULT_CATEGORIES,DIFFICULTIES
+
+TASK_LINE=re.compile(r'^\s*(\d+): ',re.MULTILINE)
+
+
+def classify(prompt):
+    ids=[int(idx) for idx in TASK_LINE.findall(prompt)]
+    return [
+        {'id':idx,'category':DEFAULT_CATEGORIES[idx%len(DEFAULT_CATEGORIES)],'diificulty':DIFFICULTIES[idx%len(DIFFICULTIES)]}
+        for idx in ids
+    ] or [{'category':DEFAULT_CATEGORIES[0],'diificulty':DIFFICULTIES[0]}]
+
+
+def chat_completion(body):
+    prompt=''.join(message.get('content','') for message in body.get('messages',[]))
+    classified=classify(prompt)
+    return {
+        'object':'chat.completion',
+        'model':body.get('model'),
+        'choices':[{'index':0,'message':{'role':'assistant','content':json.dumps({'classified':classified})},'finish_reason':'stop'}],
+        'usage':{'prompt_tokens':len(prompt)//4,'completion_tokens':10*len(classified)},
+    }
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version='HTTP/1.1'
+
+    def do_POST(self):
+        body=json.loads(self.rfile.read(int(self.headers.get('Content-Length',0))) or b'{}')
+        prompt=''.join(part.get('text','') for content in body.get('contents',[]) for part in content.get('parts',[]))
+        classified=classify(prompt)
+        payload=json.dumps({
+            'candidates':[{
+                'content':{'role':'model','parts':[{'text':json.dumps({'classified':classified})}]},
+                'finishReason':'STOP',
+            }],
+            'usageMetadata':{'promptTokenCount':len(prompt)//4,'candidatesTokenCount':10*len(classified)},
+        }).encode('utf-8')
+        self.server.requests+=1
+        self.send_response(200)
+        self.send_header('Content-Type','application/json')
+        self.send_header('Content-Length',str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self,*args):
+        pass
+
+
+class OpenAIStubHandler(BaseHTTPRequestHandler):
+    # Chat completions plus the Files and Batches endpoints. Batches finish as
+    # soon as they are created unless the server's batch_status says otherwise.
+    protocol_version='HTTP/1.1'
+
+    def do_POST(self):
+        raw=self.rfile.read(int(self.headers.get('Content-Length',0)))
+        self.server.requests+=1
+        path=self.path.split('/v1',1)[-1]
+        if path=='/chat/completions':
+            self.reply(chat_completion(json.loads(raw or b'{}')))
+        elif path=='/files':
+            # The multipart body is kept whole; the JSONL lines are found inside it
+            file_id=f'file-{next(self.server.ids)}'
+            self.server.files[file_id]=raw.decode('utf-8')
+            self.reply({'id':file_id,'object':'file','purpose':'batch'})
+        elif path=='/batches':
+            body=json.loads(raw or b'{}')
+            batch_id=f'batch-{next(self.server.ids)}'
+            output=[]
+            for line in self.server.files.get(body.get('input_file_id'),'').splitlines():
+                if not line.startswith('{'):
+                    continue
+                request=json.loads(line)
+                output.append(json.dumps({
+                    'id':f'response-{batch_id}',
+                    'custom_id':request['custom_id'],
+                    'response':{'status_code':200,'body':chat_completion(request['body'])},
+                    'error':None,
+                }))
+            output_id=f'file-{next(self.server.ids)}'
+            self.server.files[output_id]='\n'.join(output)+'\n'
+            self.server.batches[batch_id]={'id':batch_id,'object':'batch','output_file_id':output_id}
+            self.reply(self.batch(batch_id))
+        else:
+            self.reply({'error':{'message':'not found'}},404)
+
+    def do_GET(self):
+        self.server.requests+=1
+        path=self.path.split('/v1',1)[-1]
+        parts=path.strip('/').split('/')
+        if parts[0]=='batches' and parts[-1] in self.server.batches:
+            self.reply(self.batch(parts[-1]))
+        elif parts[0]=='files' and parts[-1]=='content' and parts[1] in self.server.files:
+            self.reply(self.server.files[parts[1]],content_type='application/jsonl')
+        else:
+            self.reply({'error':{'message':'not found'}},404)
+
+    def batch(self,batch_id):
+        status=self.server.batch_status
+        return {**self.server.batches[batch_id],'status':status,**({} if status=='completed' else {'output_file_id':None})}
+
+    def reply(self,body,status=200,content_type='application/json'):
+        payload=(body if isinstance(body,str) else json.dumps(body)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type',content_type)
+        self.send_header('Content-Length',str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self,*args):
+        pass
+
+
+class StubServer:
+    def __init__(self,handler=GeminiStubHandler):
+        self.server=ThreadingHTTPServer(('127.0.0.1',0),handler)
+        self.server.daemon_threads=True
+        self.server.requests=0
+        # State for OpenAIStubHandler
+        self.server.ids=itertools.count(1)
+        self.server.files={}
+        self.server.batches={}
+        self.server.batch_status='completed'
+        self.thread=threading.Thread(target=self.server.serve_forever,daemon=True)
+
+    @property
+    def url(self):
+        host,port=self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self,*exc):
+        self.server.shutdown()
+        self.server.server_close()
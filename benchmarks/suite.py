@@ -0,0 +1,424 @@
+# Benchmark suite over in-process fakes of the Tasks API, the LLM and Firestore.
+# Runs the hot functions and end-to-end runs at scaled sizes and writes
+# machine-readable results that can be compared across commits. From the
+# repository root:
+#   python -m benchmarks.suite --sizes 1000 10000 --output results.json
+#   python -m benchmarks.suite --sizes 1000 10000 --compare results.json
+import os
+import io
+import sys
+import copy
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from pathlib import Path
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks.fakes import FakeTasksService, FakeProvider, FakeTrackerProvider, FakeFirestore
+from config.constants import SYNC_STATE, TRACKER_COLUMNS
+from llm.scheduler import RequestScheduler
+from storage.analytics import TrackerArrays
+from storage.columnar import TrackerFile, ColumnarTracker
+from storage.sync import TrackerSync
+from tasks.pipeline import TaskPipeline
+from utils import SaveUtils, Firebase
+
+LISTS=4
+MODEL='fake-model'
+# Share of each list's tasks that were completed in its last week and come back reopened
+REOPENED=0.02
+
+
+class Workspace:
+    # A temporary cwd holding config/tracker.json, since the tracker paths are relative
+    def __init__(self,names):
+        self.names=names
+
+    def __enter__(self):
+        self.previous=os.getcwd()
+        self.tmp=tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        Path('config').mkdir()
+        Path('config/tracker.json').write_text(json.dumps({'lists':self.names}))
+        return self
+
+    def __exit__(self,*exc):
+        os.chdir(self.previous)
+        self.tmp.cleanup()
+
+
+class Suite:
+    def __init__(self,args):
+        self.args=args
+        self.names=[f'list {idx}' for idx in range(LISTS)]
+
+    def service(self,size):
+        return FakeTasksService({name:size//LISTS for name in self.names},latency=self.args.tasks_latency)
+
+    def provider(self):
+        provider=FakeProvider(latency=self.args.llm_latency,error_rate=self.args.error_rate,batch_size=self.args.batch_size)
+        # Budgets high enough that only the fake latency and errors shape the run
+        return RequestScheduler(provider,requests_per_minute=10**9,tokens_per_minute=10**12,backoff_base=self.args.backoff,backoff_max=self.args.backoff*8)
+
+    def pages(self,size):
+        service=self.service(size)
+        return {name:[service.task(name,idx) for idx in range(size//LISTS)] for name in self.names}
+
+    def enriched(self,size):
+        tasks_obj=FakeTrackerProvider(self.service(size))
+        provider=FakeProvider(batch_size=self.args.batch_size)
+        return {name:tasks_obj.parallel_process_tasks(items,provider,MODEL) for name,items in self.pages(size).items()}
+
+    # Each case returns (setup, run) or (setup, run, check): setup is untimed and its
+    # result is passed to run, which may return extra metrics for the record, and
+    # then to check, which raises if the run produced the wrong result
+
+    def case_parallel_process_tasks(self,size):
+        pages=self.pages(size)
+        def setup():
+            return FakeTrackerProvider(self.service(size)),self.provider()
+        def run(state):
+            tasks_obj,provider=state
+            for items in pages.values():
+                tasks_obj.parallel_process_tasks(items,provider,MODEL)
+            return {'llm_requests':provider.provider.requests,**self.scheduler_metrics(provider)}
+        return setup,run
+
+    def case_process_list_name(self,size):
+        response=self.enriched(size)
+        def run(state):
+            for name,items in response.items():
+                SaveUtils.process_list_name((name,items))
+        return None,run
+
+    def case_create_json(self,size):
+        entries=[SaveUtils.process_list_name((name,items)) for name,items in self.enriched(size).items()]
+        def setup():
+            save_utils=SaveUtils()
+            save_utils.refresh()
+            return save_utils
+        def run(save_utils):
+            save_utils.create_json(entries)
+        return setup,run
+
+    def reopened(self,size):
+        # The latest completed tasks are moved into the list's last week and arrive
+        # again as 'Not complete', so prune has REOPENED of the tasks to delete
+        response=self.enriched(size)
+        for items in response.values():
+            completed=[task for task in items if task['completed']!='Not complete']
+            count=min(len(completed),max(1,int(len(items)*REOPENED)))
+            latest=max(datetime.strptime(task['completed'],'%d-%m-%Y') for task in completed)
+            recent=completed[len(completed)-count:]
+            for offset,task in enumerate(recent):
+                task['completed']=(latest-timedelta(days=offset%7)).strftime('%d-%m-%Y')
+            items.extend({**task,'status':'needsAction','completed':'Not complete'} for task in recent)
+        return response
+
+    def case_prune(self,size):
+        response=self.reopened(size)
+        def setup():
+            save_utils=SaveUtils()
+            save_utils.refresh()
+            for name,items in response.items():
+                save_utils.merge_page(name,items)
+            return save_utils,self.entries(save_utils.store)
+        def run(state):
+            state[0].prune()
+        def check(state):
+            save_utils,before=state
+            if before-self.entries(save_utils.store)<len(response)*max(1,int(size//LISTS*REOPENED)):
+                raise AssertionError('prune: the reopened tasks were not removed')
+        return setup,run,check
+
+    @staticmethod
+    def entries(store):
+        return sum(len(day) for days in store.lists.values() for day in days.values())
+
+    def case_sync_columnar(self,size):
+        # The syncer is built before the run saves, as in main and --batch, so
+        # this also checks that it pushes the rows the save appended
+        response=self.enriched(size)
+        def setup():
+            Path('config/tracker.json').write_text(json.dumps({'lists':self.names}))
+            shutil.rmtree(TRACKER_COLUMNS,ignore_errors=True)
+            if os.path.exists(SYNC_STATE):
+                os.remove(SYNC_STATE)
+            TrackerFile().convert('columnar')
+            firebase_obj=Firebase(db=FakeFirestore(),layout=self.args.layout)
+            syncer=TrackerSync(lambda: firebase_obj)
+            SaveUtils().save(response)
+            return syncer
+        def run(syncer):
+            syncer.sync()
+            db=syncer.remote.db
+            return {'firestore_writes':db.writes,'firestore_bytes':db.bytes_written}
+        def check(syncer):
+            local=syncer.read_local()['Tracker']
+            # The other cases run on the JSON format
+            shutil.rmtree(TRACKER_COLUMNS,ignore_errors=True)
+            if not local or syncer.remote.get()['Tracker']!=local:
+                raise AssertionError('sync_columnar: the remote tracker is missing rows saved after the syncer was built')
+        return setup,run,check
+
+    def case_stats(self,size):
+        # The fake history ends years before today, so every current streak is over;
+        # a summary that stops on the last active day still counts the run
+        response=self.enriched(size)
+        def setup():
+            SaveUtils().save(response)
+            return {'arrays':TrackerArrays.load()}
+        def run(state):
+            state['summary']=state['arrays'].summary()
+        def check(state):
+            summary=state['summary']
+            if summary['streak']['current'] or any(item['current'] for item in summary['lists']):
+                raise AssertionError('stats: a tracker with no recent days reports a current streak')
+            last=date.fromisoformat(summary['streak']['last']).toordinal()
+            if not state['arrays'].summary(until=last)['streak']['current']:
+                raise AssertionError('stats: the streak ending on the last day of the range is not current')
+        return setup,run,check
+
+    def case_sync_conflict(self,size):
+        # After a first sync, another machine and this one each add a day, drop an
+        # entry and add to one shared new day. The three-way merge must keep every
+        # addition and both removals, and leave the two sides identical.
+        response=self.enriched(size)
+        def setup():
+            Path('config/tracker.json').write_text(json.dumps({'lists':self.names}))
+            if os.path.exists(SYNC_STATE):
+                os.remove(SYNC_STATE)
+            SaveUtils().save(response)
+            db=FakeFirestore()
+            syncer=TrackerSync(lambda: Firebase(db=db,layout=self.args.layout))
+            syncer.sync()
+            expected={'added':[],'removed':[]}
+            other=Firebase(db=db,layout=self.args.layout)
+            remote=copy.deepcopy(other.get())
+            local=syncer.read_local()
+            for side,data,list_name in (('remote',remote,self.names[0]),('local',local,self.names[-1])):
+                days=data['Tracker'][list_name]
+                date_key=next(iter(days))
+                expected['removed'].append((list_name,date_key,days[date_key].pop()['title']))
+                if not days[date_key]:
+                    del days[date_key]
+                for new_day in ('01-01-2030' if side=='remote' else '02-01-2030','03-01-2030'):
+                    task={'title':f'{side} task','category':'Work','difficulty':'Easy'}
+                    days.setdefault(new_day,[]).append(task)
+                    expected['added'].append((list_name,new_day,task['title']))
+            remote['Version']+=1
+            other.push(remote)
+            syncer.write_local(local)
+            return {'syncer':syncer,'expected':expected}
+        def run(state):
+            state['result']=state['syncer'].sync()
+        def check(state):
+            syncer,expected=state['syncer'],state['expected']
+            local=syncer.read_local()['Tracker']
+            titles=lambda list_name,date_key: {task['title'] for task in local.get(list_name,{}).get(date_key,[])}
+            if not state['result']['conflict'] or syncer.remote.get()['Tracker']!=local:
+                raise AssertionError('sync_conflict: the merged tracker differs between the two sides')
+            if any(title not in titles(list_name,date_key) for list_name,date_key,title in expected['added']):
+                raise AssertionError('sync_conflict: an entry added on one side was lost in the merge')
+            if any(title in titles(list_name,date_key) for list_name,date_key,title in expected['removed']):
+                raise AssertionError('sync_conflict: an entry removed on one side came back in the merge')
+        return setup,run,check
+
+    def case_columnar_prune(self,size):
+        # Saving reopened tasks into the columnar format appends their removals as
+        # tombstones; replaying them, and compacting them away, must both give
+        # back exactly the history the save held in memory
+        response=self.reopened(size)
+        def setup():
+            Path('config/tracker.json').write_text(json.dumps({'lists':self.names}))
+            shutil.rmtree(TRACKER_COLUMNS,ignore_errors=True)
+            TrackerFile().convert('columnar')
+            return SaveUtils()
+        def run(save_utils):
+            save_utils.save(response)
+        def check(save_utils):
+            expected=save_utils.store.to_dict()
+            columns=ColumnarTracker()
+            replayed=TrackerFile().read()['Tracker']
+            removed=columns.index['removed']
+            columns.write(columns.load_store())
+            compacted=TrackerFile().read()['Tracker']
+            # The other cases run on the JSON format
+            shutil.rmtree(TRACKER_COLUMNS,ignore_errors=True)
+            if not removed:
+                raise AssertionError('columnar_prune: the reopened tasks were not written as tombstones')
+            if replayed!=expected or compacted!=expected:
+                raise AssertionError('columnar_prune: the tracker read back differs from the one saved')
+        return setup,run,check
+
+    def end_to_end(self,size,mode,full_resync=True):
+        def setup():
+            Path('config/tracker.json').write_text(json.dumps({'lists':self.names}))
+            if not full_resync:
+                # A previous run merged the same history; dropping the watermarks
+                # re-fetches every task so only the fingerprints can skip them
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.process(size,'default',True,FakeTrackerProvider(self.service(size)),self.provider(),SaveUtils())
+                data=json.loads(Path('config/tracker.json').read_text())
+                data['Sync']={}
+                Path('config/tracker.json').write_text(json.dumps(data))
+            if os.path.exists(SYNC_STATE):
+                os.remove(SYNC_STATE)
+            firebase_obj=Firebase(db=FakeFirestore(),layout=self.args.layout)
+            # Built before the run, as in main, and synced after the save
+            return FakeTrackerProvider(self.service(size)),self.provider(),SaveUtils(),TrackerSync(lambda: firebase_obj)
+        def run(state):
+            tasks_obj,provider,save_utils,syncer=state
+            self.process(size,mode,full_resync,tasks_obj,provider,save_utils)
+            syncer.sync()
+            db=syncer.remote.db
+            return {
+                'llm_requests':provider.provider.requests,
+                **self.scheduler_metrics(provider),
+                'firestore_writes':db.writes,
+                'firestore_bytes':db.bytes_written,
+                'tracker_bytes':os.path.getsize('config/tracker.json'),
+            }
+        return setup,run
+
+    def process(self,size,mode,full_resync,tasks_obj,provider,save_utils):
+        titles=set(self.names)
+        if mode=='stream':
+            save_utils.refresh()
+            for list_name,page in tasks_obj.stream_google_tasks(titles,provider,MODEL,full_resync=full_resync):
+                save_utils.merge_page(list_name,page)
+            save_utils.finish(tasks_obj.watermarks)
+        elif mode=='pipeline':
+            TaskPipeline(tasks_obj,provider,MODEL,save_utils,llm_concurrency=self.args.llm_concurrency,fetch_concurrency=self.args.fetch_concurrency).run(titles,full_resync=full_resync)
+        else:
+            response=tasks_obj.list_google_tasks(titles,provider,MODEL,full_resync=full_resync,fetch_concurrency=self.args.fetch_concurrency)
+            save_utils.save(response,tasks_obj.watermarks)
+        tasks_obj.fingerprints.save()
+
+    def case_e2e_default(self,size):
+        return self.end_to_end(size,'default')
+
+    def case_e2e_stream(self,size):
+        return self.end_to_end(size,'stream')
+
+    def case_e2e_pipeline(self,size):
+        return self.end_to_end(size,'pipeline')
+
+    def case_e2e_unchanged(self,size):
+        return self.end_to_end(size,'default',full_resync=False)
+
+    @staticmethod
+    def scheduler_metrics(provider):
+        stats=provider.stats()
+        return {key:stats[key] for key in ('retries','throttled','failures','held')}
+
+    @classmethod
+    def cases(cls):
+        return [name[len('case_'):] for name in dir(cls) if name.startswith('case_')]
+
+    def measure(self,name,size):
+        setup,run,*check=getattr(self,'case_'+name)(size)
+        timings=[]
+        metrics={}
+        for _ in range(self.args.repeat):
+            # The pruning loop prints every deleted entry
+            with contextlib.redirect_stdout(io.StringIO()):
+                state=setup() if setup else None
+                start=time.perf_counter()
+                metrics=run(state) or {}
+                timings.append(time.perf_counter()-start)
+                for verify in check:
+                    verify(state)
+        return {
+            'case':name,
+            'size':size,
+            'repeat':self.args.repeat,
+            'median':round(statistics.median(timings),6),
+            'min':round(min(timings),6),
+            'max':round(max(timings),6),
+            'tasks_per_second':round(size/statistics.median(timings),1) if statistics.median(timings) else None,
+            **metrics,
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git','rev-parse','--short','HEAD'],capture_output=True,text=True,check=True,cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+
+def compare(results,params,baseline_path,tolerance):
+    with open(baseline_path,'r') as f:
+        report=json.load(f)
+    baseline={(r['case'],r['size']):r for r in report['results']}
+    # Timings are only comparable when the fakes were configured the same way
+    ignored={'sizes','cases','repeat','tolerance'}
+    differing=sorted(key for key,value in params.items() if key not in ignored and report['meta']['params'].get(key)!=value)
+    if differing:
+        print(f"\nWarning: baseline ran with different {', '.join(differing)}")
+    regressions=0
+    print(f"\n{'case':<24} {'tasks':>8} {'baseline':>10} {'current':>10} {'change':>8}")
+    for result in results:
+        before=baseline.get((result['case'],result['size']))
+        if before is None:
+            continue
+        change=result['median']/before['median']-1 if before['median'] else 0.0
+        flag=''
+        # Sub-millisecond cases are dominated by timer noise
+        if change>tolerance and result['median']-before['median']>0.001:
+            regressions+=1
+            flag='  regression'
+        print(f"{result['case']:<24} {result['size']:>8} {before['median']*1000:>8.1f}ms {result['median']*1000:>8.1f}ms {change:>+7.1%}{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description="Benchmark hot paths and end-to-end runs against in-process fakes")
+    parser.add_argument('--sizes',type=int,nargs='+',default=[1000,10000])
+    parser.add_argument('--cases',nargs='+',choices=Suite.cases(),default=Suite.cases())
+    parser.add_argument('--repeat',type=int,default=3)
+    parser.add_argument('--llm-latency',type=float,default=0.0,help="Seconds per fake LLM request")
+    parser.add_argument('--tasks-latency',type=float,default=0.0,help="Seconds per fake Tasks API page")
+    parser.add_argument('--error-rate',type=float,default=0.0,help="Share of fake LLM requests failing with 429/503")
+    parser.add_argument('--backoff',type=float,default=0.001,help="Retry backoff base in seconds")
+    parser.add_argument('--batch-size',type=int,default=20)
+    parser.add_argument('--llm-concurrency',type=int,default=8)
+    parser.add_argument('--fetch-concurrency',type=int,default=4)
+    parser.add_argument('--layout',choices=['single','sharded'],default='single')
+    parser.add_argument('--output',help="Write the results as JSON to this path")
+    parser.add_argument('--compare',metavar='BASELINE',help="Compare medians with an earlier --output file")
+    parser.add_argument('--tolerance',type=float,default=0.2,help="Slowdown counted as a regression by --compare")
+    args=parser.parse_args()
+
+    suite=Suite(args)
+    results=[]
+    print(f"{'case':<24} {'tasks':>8} {'median':>10} {'tasks/s':>12}")
+    with Workspace(suite.names):
+        for size in args.sizes:
+            for name in args.cases:
+                result=suite.measure(name,size)
+                results.append(result)
+                print(f"{name:<24} {size:>8} {result['median']*1000:>8.1f}ms {result['tasks_per_second'] or 0:>12.0f}")
+
+    report={
+        'meta':{
+            'commit':git_commit(),
+            'timestamp':datetime.now(timezone.utc).isoformat(),
+            'python':platform.python_version(),
+            'platform':platform.platform(),
+            'params':{key:value for key,value in vars(args).items() if key not in ('output','compare')},
+        },
+        'results':results,
+    }
+    if args.output:
+        with open(args.output,'w') as f:
+            json.dump(report,f,indent=2)
+    if args.compare and compare(results,report['meta']['params'],args.compare,args.tolerance):
+        sys.exit(1)
@@ -1,27 +1,113 @@
 CONFIG_FILE='.habit'
-SCHEME="""
+# Static classification instructions, sent once as the system context (cached
+# by the provider where it can) while each request carries only the task lines
+INSTRUCTIONS="""
     THE ONLY CATEFORIES THAT YOU ARE AWARE OF ARE{categories}
-    You are a usefull personal assitant that will categorize a task into the following categories {categories} based on the task.  
-    You are also fully capable of describing the task in hand as EASY,MEDIUM,HARD
-    
-    
-    ============
-    This is the task 
-    {task}
-    
+    You are a usefull personal assitant that will categorize each task you are given into the following categories {categories}.
+    You are also fully capable of describing each task as EASY,MEDIUM,HARD
+
+    Tasks are given one per line as <id>: <task>. Return exactly one classification per task
+    and copy the task id into the id field when there is one.
     """
+# Seconds a provider-side context cache lives before it is recreated
+PROMPT_CACHE_TTL=3600
+# Gemini refuses explicit caches below this many tokens; smaller instructions are sent inline
+GEMINI_CACHE_MIN_TOKENS=1024
+DEFAULT_BATCH_SIZE=20
+BATCH_SIZE_LABEL='BATCH_SIZE'
+DIFFICULTIES=['EASY','MEDIUM','HARD']
+# Worker threads issuing LLM requests, and pooled HTTP connections shared by them
+LLM_CONCURRENCY=8
+
+# Request scheduler budgets and retry policy shared by every provider
+LLM_RPM=60
+LLM_TPM=200000
+LLM_RPM_LABEL='LLM_RPM'
+LLM_TPM_LABEL='LLM_TPM'
+LLM_MAX_RETRIES=5
+LLM_BACKOFF_BASE=1.0
+LLM_BACKOFF_MAX=60.0
+LLM_BREAKER_THRESHOLD=5
+LLM_BREAKER_RESET=120.0
+RETRYABLE_STATUS=[408,429,500,502,503,504]
+
+# Local pre-classifier: answer without the LLM once the posterior reaches LOCAL_CONFIDENCE
+LOCAL_CONFIDENCE=0.9
+LOCAL_CONFIDENCE_LABEL='LOCAL_CONFIDENCE'
+LOCAL_MIN_SAMPLES=30
+# Share of confident local answers still sent to the LLM to measure agreement
+LOCAL_AUDIT_RATE=0.05
+
+# Bump whenever INSTRUCTIONS or the response schemas change so cached classifications are not reused.
+# 2: batched prompt and BatchResponse schema; 3: INSTRUCTIONS sent as a system context
+SCHEME_VERSION=3
 
 DEFAULT_CATEGORIES=['Work','Play','Health']
 GEMINI_API_LABEL='GEMINI_API_KEY'
 GEMINI_MODEL_LABEL='GEMINI_MODEL'
+GEMINI_BASE_URL_LABEL='GEMINI_BASE_URL'
 
 
 OPENAI_API_LABEL='OPEN_API_KEY'
 OPENAI_MODEL_LABEL='OPENAI_MODEL'
+OPENAI_BASE_URL='https://api.openai.com/v1'
+OPENAI_BASE_URL_LABEL='OPENAI_BASE_URL'
+OPENAI_TIMEOUT=60.0
+# Deferred mode queues unclassified tasks into one Batch API job per run and
+# collects its answers on a later run; pending jobs are tracked in OPENAI_BATCHES
+OPENAI_DEFERRED_LABEL='OPENAI_DEFERRED'
+OPENAI_BATCHES='config/openai_batches.json'
+OPENAI_BATCH_WINDOW='24h'
 
 SCOPES = ['https://www.googleapis.com/auth/tasks.readonly']
+# Largest page sizes the Tasks API accepts
+TASKLISTS_PAGE_SIZE=1000
+TASKS_PAGE_SIZE=100
+FETCH_CONCURRENCY=4
+FETCH_CONCURRENCY_LABEL='FETCH_CONCURRENCY'
+# Pages buffered between pipeline stages before upstream stages wait
+PIPELINE_QUEUE_SIZE=8
+# Users processed at once by --batch
+BATCH_CONCURRENCY=4
+# --watch polls every WATCH_INTERVAL seconds, give or take WATCH_JITTER of it
+WATCH_INTERVAL=300
+WATCH_INTERVAL_LABEL='WATCH_INTERVAL'
+WATCH_JITTER=0.1
+# Tokens are refreshed once they are this close to expiry, in the background
+# while a process runs and by --watch before each poll
+TOKEN_REFRESH_MARGIN=300
+# Where the Tasks discovery document is kept when the client library does not ship one
+TASKS_DISCOVERY='config/tasks_discovery.json'
+TASKS_DISCOVERY_URL='https://tasks.googleapis.com/$discovery/rest?version=v1'
+TASKS_HTTP_TIMEOUT=60
+HEALTH_PORT=8765
+HEALTH_PORT_LABEL='HEALTH_PORT'
 LIST_TRACKER='config/tracker.json'
 
 GOOGLE_CRED='config/credentials.json'
 LOCAL_CRED='config/token.pickle'
-FIREBASE_CRED='config/firebase.json'
\ No newline at end of file
+FIREBASE_CRED='config/firebase.json'
+# 'single' keeps the whole tracker in habit/tracker, 'sharded' splits it per list and month
+FIRESTORE_LAYOUT='single'
+FIRESTORE_LAYOUT_LABEL='FIRESTORE_LAYOUT'
+FIRESTORE_BATCH_LIMIT=500
+# Versions and hashes of the tracker as of the last successful sync
+SYNC_STATE='config/sync_state.json'
+# Per-task content hashes from the last merge, kept next to the tracker but never synced
+FINGERPRINTS='config/fingerprints.json'
+# Heatmap rollups published to habit/heatmap for the app
+AGGREGATES='config/aggregates.json'
+# Days of per-day counts published; the app's heatmap shows one year
+HEATMAP_DAYS=365
+# Columnar tracker history (--storage columnar); rewritten once tombstones exceed this share of rows
+TRACKER_COLUMNS='config/tracker_columns'
+COLUMNAR_COMPACT_RATIO=0.25
+
+# Lists with at least this many completed tasks are grouped with numpy when it is installed
+GROUPING_NUMPY_THRESHOLD=50000
+
+CLASSIFICATION_CACHE='config/classification_cache.json'
+CACHE_MAX_ENTRIES=20000
+
+# Trace written by --profile, in the OTLP/JSON layout
+PROFILE_TRACE='config/profile_trace.json'
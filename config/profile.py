@@ -0,0 +1,41 @@
+from config.constants import (LIST_TRACKER,GOOGLE_CRED,LOCAL_CRED,FIREBASE_CRED,SYNC_STATE,FINGERPRINTS,
+                              AGGREGATES,TRACKER_COLUMNS)
+
+import os
+
+CONFIG_DIR=os.path.dirname(LIST_TRACKER)
+
+
+class Profile:
+    # Where one user's credentials and tracker state live. The default profile is
+    # the single-user layout under config/; the batch runner gives each user a
+    # root directory with the same file names.
+    def __init__(self,name='default',root=CONFIG_DIR,google_credentials=None,firebase_credentials=None,firestore_layout=None):
+        self.name=name
+        self.root=root
+        self.tracker=self.path(LIST_TRACKER)
+        self.token=self.path(LOCAL_CRED)
+        self.sync_state=self.path(SYNC_STATE)
+        self.fingerprints=self.path(FINGERPRINTS)
+        self.aggregates=self.path(AGGREGATES)
+        self.columns=self.path(TRACKER_COLUMNS)
+        # The OAuth client secret may be shared by everyone; the Firebase project need not be
+        self.google_credentials=google_credentials or self.path(GOOGLE_CRED)
+        self.firebase_credentials=firebase_credentials or self.path(FIREBASE_CRED)
+        # None falls back to FIRESTORE_LAYOUT in ~/.habit
+        self.firestore_layout=firestore_layout
+
+    def path(self,default):
+        return os.path.join(self.root,os.path.relpath(default,CONFIG_DIR))
+
+    @classmethod
+    def from_manifest(cls,entry,base_dir='.'):
+        root=os.path.join(base_dir,entry.get('root',entry['name']))
+        resolve=lambda path: os.path.join(base_dir,path) if path else None
+        return cls(
+            name=entry['name'],
+            root=root,
+            google_credentials=resolve(entry.get('google_credentials')),
+            firebase_credentials=resolve(entry.get('firebase_credentials')),
+            firestore_layout=entry.get('firestore_layout'),
+        )
@@ -7,7 +7,6 @@ from config.constants import CONFIG_FILE,GEMINI_MODEL_LABEL,OPENAI_MODEL_LABEL,L
 from config.question_model import SelectProviderQuestions, SetupQuestions
 from llm.Gemini.setup import GeminiQuestions
 from llm.OpenAI.setup import OpenAIQuestions
-from tasks.getTasks import TrackerProvider
 from views.setup_view import SetupView
 class Setup: 
     def __init__(self):
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import bisect
+import threading
+import contextvars
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS=(0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0,30.0)
+
+
+class NullSpan:
+    # Shared no-op span so a disabled tracer costs one attribute check per call
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        return False
+
+    def set(self,key,value):
+        pass
+
+
+NULL_SPAN=NullSpan()
+
+
+class Span:
+    def __init__(self,tracer,name,attributes):
+        self.tracer=tracer
+        self.name=name
+        self.attributes=attributes
+        self.span_id=os.urandom(8).hex()
+        self.parent_id=None
+        self.start=None
+        self.end=None
+        self.error=None
+
+    def set(self,key,value):
+        self.attributes[key]=value
+
+    def __enter__(self):
+        parent=self.tracer.current.get()
+        self.parent_id=parent.span_id if parent else None
+        self.token=self.tracer.current.set(self)
+        self.start=time.time_ns()
+        self.clock=time.perf_counter()
+        return self
+
+    def __exit__(self,exc_type,exc,tb):
+        self.duration=time.perf_counter()-self.clock
+        self.end=self.start+int(self.duration*1e9)
+        self.error=repr(exc) if exc is not None else None
+        self.tracer.current.reset(self.token)
+        self.tracer.finish(self)
+        return False
+
+
+class Tracer:
+    # Stage timings, counters and histograms for one run. Everything is a no-op
+    # until enable() is called, so instrumented code paths can stay in place.
+    def __init__(self):
+        self.enabled=False
+        self.current=contextvars.ContextVar('span',default=None)
+        self.reset()
+
+    def reset(self):
+        self.trace_id=os.urandom(16).hex()
+        self.lock=threading.Lock()
+        self.spans=[]
+        self.stages={}
+        self.counters={}
+        self.histograms={}
+
+    def enable(self):
+        self.reset()
+        self.enabled=True
+
+    def span(self,name,**attributes):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self,name,attributes)
+
+    def finish(self,span):
+        with self.lock:
+            self.spans.append(span)
+            stage=self.stages.setdefault(span.name,{'calls':0,'total':0.0,'max':0.0,'errors':0})
+            stage['calls']+=1
+            stage['total']+=span.duration
+            stage['max']=max(stage['max'],span.duration)
+            if span.error:
+                stage['errors']+=1
+
+    def count(self,name,amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name]=self.counters.get(name,0)+amount
+
+    def observe(self,name,value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.histograms.setdefault(name,[]).append(value)
+
+    @staticmethod
+    def size_of(payload):
+        # Serialised size, only ever computed while tracing
+        if isinstance(payload,(bytes,bytearray)):
+            return len(payload)
+        if isinstance(payload,str):
+            return len(payload.encode('utf-8'))
+        return len(json.dumps(payload,default=str).encode('utf-8'))
+
+    def count_bytes(self,name,payload):
+        if self.enabled and payload is not None:
+            self.count(name,self.size_of(payload))
+
+    @staticmethod
+    def percentile(values,share):
+        ordered=sorted(values)
+        return ordered[min(len(ordered)-1,int(share*len(ordered)))]
+
+    def summary(self):
+        with self.lock:
+            stages=[
+                {'name':name,'calls':stage['calls'],'total':stage['total'],'mean':stage['total']/stage['calls'],'max':stage['max'],'errors':stage['errors']}
+                for name,stage in sorted(self.stages.items(),key=lambda item: -item[1]['total'])
+            ]
+            histograms={}
+            for name,values in self.histograms.items():
+                buckets=[0]*(len(LATENCY_BUCKETS)+1)
+                for value in values:
+                    buckets[bisect.bisect_left(LATENCY_BUCKETS,value)]+=1
+                histograms[name]={
+                    'count':len(values),
+                    'p50':self.percentile(values,0.5),
+                    'p95':self.percentile(values,0.95),
+                    'max':max(values),
+                    'buckets':dict(zip([str(bound) for bound in LATENCY_BUCKETS]+['+Inf'],buckets)),
+                }
+            return {'stages':stages,'counters':dict(sorted(self.counters.items())),'histograms':histograms}
+
+    @staticmethod
+    def attribute(key,value):
+        if isinstance(value,bool):
+            return {'key':key,'value':{'boolValue':value}}
+        if isinstance(value,int):
+            return {'key':key,'value':{'intValue':str(value)}}
+        if isinstance(value,float):
+            return {'key':key,'value':{'doubleValue':value}}
+        return {'key':key,'value':{'stringValue':str(value)}}
+
+    def export(self,path):
+        # OTLP/JSON layout, so the file loads into any OpenTelemetry-compatible viewer
+        with self.lock:
+            spans=[{
+                'traceId':self.trace_id,
+                'spanId':span.span_id,
+                'parentSpanId':span.parent_id or '',
+                'name':span.name,
+                'startTimeUnixNano':str(span.start),
+                'endTimeUnixNano':str(span.end),
+                'attributes':[self.attribute(key,value) for key,value in span.attributes.items()],
+                'status':{'code':2,'message':span.error} if span.error else {'code':1},
+            } for span in self.spans]
+        trace={
+            'resourceSpans':[{
+                'resource':{'attributes':[self.attribute('service.name','habit-tracker')]},
+                'scopeSpans':[{'scope':{'name':'habit-tracker'},'spans':spans}],
+            }],
+            'summary':self.summary(),
+        }
+        with open(path,'w') as f:
+            json.dump(trace,f,indent=2)
+
+
+TRACER=Tracer()
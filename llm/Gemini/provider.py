@@ -1,25 +1,101 @@
 from llm.base_provider import BaseProvider
-from config.constants import DEFAULT_CATEGORIES,SCHEME,GEMINI_MODEL_LABEL
+from llm.prompts import PromptLayer,TokenUsage
+from config.constants import DEFAULT_CATEGORIES,DEFAULT_BATCH_SIZE,LLM_CONCURRENCY,GEMINI_MODEL_LABEL,PROMPT_CACHE_TTL,GEMINI_CACHE_MIN_TOKENS
+
+from instrumentation import TRACER
+
+import time
+import threading
 
 class GeminiProvider(BaseProvider):
-    def __init__(self,api):
+    def __init__(self,api,batch_size=DEFAULT_BATCH_SIZE,base_url=None,max_connections=LLM_CONCURRENCY):
         self.categories=DEFAULT_CATEGORIES
         self.api=api
+        self.batch_size=max(1,int(batch_size))
+        self.base_url=base_url
+        self.max_connections=max_connections
+        self.prompts=PromptLayer(self.categories)
+        self.usage=TokenUsage()
+        self._client=None
+        self._client_lock=threading.Lock()
+        # model -> (cached content name or None, monotonic expiry)
+        self.contexts={}
+        self._context_lock=threading.Lock()
+        # Below the minimum the create call is refused (or costs more than it saves),
+        # so the instructions go inline without asking
+        self.cacheable=self.prompts.estimate_tokens([])>=GEMINI_CACHE_MIN_TOKENS
+
+    @property
+    def client(self):
+        # One client per provider: its httpx pool is shared by every worker thread
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client=self.create_client()
+        return self._client
 
-    def get_category(self,task,model):
+    def create_client(self):
         from google import genai
-        import json 
-        from llm.base_response import BaseResponse
+        import httpx
 
+        http_options={
+            'client_args':{
+                'limits':httpx.Limits(max_connections=self.max_connections,max_keepalive_connections=self.max_connections),
+            },
+        }
+        if self.base_url:
+            http_options['base_url']=self.base_url
+        return genai.Client(api_key=self.api,http_options=http_options)
 
-        client = genai.Client(api_key=self.api)
-        response = client.models.generate_content(
-            model=model,
-            contents=SCHEME.format(categories=self.categories,task=task),
-            config={
-            "response_mime_type": "application/json",
-            "response_schema": BaseResponse,
-        },
-        )
+    def cached_context(self,model):
+        # The instructions as a Gemini cached content, recreated shortly before its TTL
+        # runs out. Instructions below GEMINI_CACHE_MIN_TOKENS, and models that refuse
+        # the cache, get them as a system instruction instead.
+        if not self.cacheable:
+            return None
+        with self._context_lock:
+            name,expires=self.contexts.get(model,(None,0.0))
+            if time.monotonic()<expires:
+                return name
+            try:
+                with TRACER.span('llm.context_cache',model=model):
+                    name=self.client.caches.create(
+                        model=model,
+                        config={'system_instruction':self.prompts.system,'ttl':f'{PROMPT_CACHE_TTL}s','display_name':'habit-tracker-instructions'},
+                    ).name
+            except Exception:
+                TRACER.count('llm.context_cache_unavailable')
+                name=None
+            # A refusal is not retried for the rest of the TTL either
+            self.contexts[model]=(name,time.monotonic()+PROMPT_CACHE_TTL*0.9)
+            return name
 
-        return json.loads(response.text)['classified'].pop()
\ No newline at end of file
+    def generate(self,model,contents,schema,size):
+        config={
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+        }
+        cached=self.cached_context(model)
+        if cached:
+            config['cached_content']=cached
+        else:
+            config['system_instruction']=self.prompts.system
+        with TRACER.span('llm.request',model=model,tasks=size) as span:
+            try:
+                response = self.client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=config,
+                )
+            except Exception:
+                # The cache may have been evicted early; the retry creates a new one
+                if cached:
+                    with self._context_lock:
+                        self.contexts.pop(model,None)
+                raise
+            usage=response.usage_metadata
+            if usage is not None:
+                self.usage.record(usage.prompt_token_count,usage.candidates_token_count,usage.cached_content_token_count,span)
+        TRACER.count_bytes('llm.bytes_written',contents)
+        TRACER.count_bytes('llm.bytes_read',response.text)
+        return response.text
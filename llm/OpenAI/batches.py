@@ -0,0 +1,106 @@
+from config.constants import OPENAI_BATCHES
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+
+class DeferredBatches:
+    # Batch API jobs submitted by earlier runs and the answers collected from
+    # them. A title is queued once, stays pending while its job runs, and its
+    # answer is handed out on a later run, after which the classification cache
+    # keeps it. Titles a finished job did not answer are simply queued again.
+    def __init__(self,path=OPENAI_BATCHES):
+        self.path=path
+        self.lock=threading.Lock()
+        self.jobs={}
+        self.results={}
+        self.queued={}
+        self.served=set()
+        self.collected=0
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path,'r') as f:
+                data=json.load(f)
+        except (OSError,ValueError):
+            # Losing the state only means the pending titles are submitted again
+            return
+        self.jobs=data.get('jobs',{})
+        self.results=data.get('results',{})
+
+    def pending(self):
+        with self.lock:
+            return dict(self.jobs)
+
+    def pending_titles(self,model):
+        return {
+            title
+            for job in self.jobs.values() if job['model']==model
+            for titles in job['requests'].values()
+            for title in titles
+        }
+
+    def take(self,tasks,model):
+        # Answers for the titles that have one; the rest are queued for the next job
+        with self.lock:
+            answers=self.results.get(model,{})
+            pending=self.pending_titles(model)
+            queued=self.queued.setdefault(model,{})
+            results=[]
+            for task in tasks:
+                answer=answers.get(task)
+                if answer is not None:
+                    self.served.add((model,task))
+                elif task not in pending:
+                    queued[task]=None
+                results.append(answer)
+            return results
+
+    def drain(self):
+        with self.lock:
+            queued={model:list(titles) for model,titles in self.queued.items() if titles}
+            self.queued={}
+            return queued
+
+    def add_job(self,job_id,model,requests):
+        with self.lock:
+            self.jobs[job_id]={
+                'model':model,
+                'requests':requests,
+                'submitted':datetime.now(timezone.utc).isoformat(),
+            }
+
+    def complete_job(self,job_id,answers):
+        # answers maps titles to classifications; a job is dropped once it finished either way
+        with self.lock:
+            job=self.jobs.pop(job_id,None)
+            if job is None:
+                return
+            self.results.setdefault(job['model'],{}).update(answers)
+            self.collected+=len(answers)
+
+    def save(self):
+        # Answers handed out this run now live in the classification cache
+        with self.lock:
+            results={
+                model:{title:answer for title,answer in answers.items() if (model,title) not in self.served}
+                for model,answers in self.results.items()
+            }
+            tmp_path=self.path+'.tmp'
+            with open(tmp_path,'w') as f:
+                json.dump({'jobs':self.jobs,'results':{model:answers for model,answers in results.items() if answers}},f)
+            os.replace(tmp_path,self.path)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'jobs':len(self.jobs),
+                'pending':sum(len(titles) for job in self.jobs.values() for titles in job['requests'].values()),
+                'collected':self.collected,
+                'served':len(self.served),
+            }
@@ -1,7 +1,220 @@
 from llm.base_provider import BaseProvider
+from llm.base_response import BatchResponse
+from llm.OpenAI.batches import DeferredBatches
+from llm.prompts import PromptLayer,TokenUsage
+from config.constants import (DEFAULT_CATEGORIES,DEFAULT_BATCH_SIZE,LLM_CONCURRENCY,OPENAI_BASE_URL,
+                              OPENAI_TIMEOUT,OPENAI_BATCHES,OPENAI_BATCH_WINDOW)
+
+from instrumentation import TRACER
+
+import json
+import asyncio
+import threading
+
+# Batch statuses after which the job's output file no longer changes
+FINISHED={'completed','failed','expired','cancelled'}
+
+
+def strict_schema(schema):
+    # Strict structured outputs need every object closed and every property required
+    if isinstance(schema,dict):
+        if schema.get('type')=='object':
+            schema['additionalProperties']=False
+            schema['required']=list(schema.get('properties',{}))
+        for value in schema.values():
+            strict_schema(value)
+    elif isinstance(schema,list):
+        for value in schema:
+            strict_schema(value)
+    return schema
+
+
 class OpenAIProvider(BaseProvider):
-    def __init__():
-        pass
+    # Talks to the OpenAI REST API (or any compatible base URL) through one
+    # pooled httpx.AsyncClient. The client lives on its own event loop thread,
+    # so every LLM worker thread shares its connections and requests overlap.
+    # With deferred=True nothing is classified live: tasks are queued into one
+    # Batch API job per run and answered on a later run once the job finishes.
+    def __init__(self,api,batch_size=DEFAULT_BATCH_SIZE,base_url=None,max_connections=LLM_CONCURRENCY,deferred=False,batches_path=OPENAI_BATCHES):
+        self.categories=DEFAULT_CATEGORIES
+        self.api=api
+        self.batch_size=max(1,int(batch_size))
+        self.base_url=(base_url or OPENAI_BASE_URL).rstrip('/')
+        self.max_connections=max_connections
+        self.deferred=deferred
+        self.prompts=PromptLayer(self.categories)
+        self.usage=TokenUsage()
+        self.batches=DeferredBatches(batches_path) if deferred else None
+        self._client=None
+        self._loop=None
+        self._loop_lock=threading.Lock()
+        self._collect_lock=threading.Lock()
+        self._collected=False
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop=asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever,name='openai-client',daemon=True).start()
+                    self._loop=loop
+        return self._loop
+
+    def run(self,coroutine):
+        # Blocks the calling worker thread until the loop thread has the answer
+        return asyncio.run_coroutine_threadsafe(coroutine,self.loop).result()
+
+    @property
+    def client(self):
+        # Only used from the loop thread, so creating it needs no lock
+        if self._client is None:
+            self._client=self.create_client()
+        return self._client
+
+    def create_client(self):
+        import httpx
+
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Authorization':f'Bearer {self.api}'},
+            limits=httpx.Limits(max_connections=self.max_connections,max_keepalive_connections=self.max_connections),
+            timeout=OPENAI_TIMEOUT,
+        )
+
+    async def request(self,method,path,**kwargs):
+        response=await self.client.request(method,path,**kwargs)
+        # HTTPStatusError carries the status code and retry-after header the scheduler reads
+        response.raise_for_status()
+        return response
+
+    def chat_body(self,model,contents,schema):
+        # The system message is the same for every request, so OpenAI's automatic
+        # prompt caching can reuse it once it is long enough to qualify
+        return {
+            'model':model,
+            'messages':[
+                {'role':'system','content':self.prompts.system},
+                {'role':'user','content':contents},
+            ],
+            'response_format':{
+                'type':'json_schema',
+                'json_schema':{'name':schema.__name__,'schema':strict_schema(schema.model_json_schema()),'strict':True},
+            },
+        }
+
+    @staticmethod
+    def message_text(completion):
+        return completion['choices'][0]['message']['content']
+
+    def record_usage(self,completion,span=None):
+        usage=completion.get('usage') or {}
+        cached=(usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+        self.usage.record(usage.get('prompt_tokens'),usage.get('completion_tokens'),cached,span)
+
+    async def complete(self,model,contents,schema):
+        response=await self.request('POST','/chat/completions',json=self.chat_body(model,contents,schema))
+        return response.json()
+
+    def generate(self,model,contents,schema,size):
+        with TRACER.span('llm.request',model=model,tasks=size) as span:
+            completion=self.run(self.complete(model,contents,schema))
+            self.record_usage(completion,span)
+        text=self.message_text(completion)
+        TRACER.count_bytes('llm.bytes_written',contents)
+        TRACER.count_bytes('llm.bytes_read',text)
+        return text
+
+    def get_categories(self,tasks,model):
+        if self.deferred:
+            return self.defer(tasks,model)
+        return super().get_categories(tasks,model)
+
+    def defer(self,tasks,model):
+        self.collect()
+        return self.batches.take(tasks,model)
+
+    def collect(self):
+        # Finished jobs are read once per run, before the first lookup
+        with self._collect_lock:
+            if self._collected:
+                return
+            self._collected=True
+            for job_id,job in self.batches.pending().items():
+                try:
+                    answers=self.run(self.fetch_job(job_id,job))
+                except Exception:
+                    # Unreachable API: the job stays pending and is polled next run
+                    TRACER.count('llm.batch_errors')
+                    continue
+                if answers is not None:
+                    self.batches.complete_job(job_id,answers)
+
+    async def fetch_job(self,job_id,job):
+        # None while the job is still running, else the answers by title
+        batch=(await self.request('GET',f'/batches/{job_id}')).json()
+        if batch.get('status') not in FINISHED:
+            return None
+        answers={}
+        if batch.get('output_file_id'):
+            content=(await self.request('GET',f"/files/{batch['output_file_id']}/content")).text
+            for line in content.splitlines():
+                answers.update(self.read_output(line,job['requests']))
+        return answers
+
+    def read_output(self,line,requests):
+        try:
+            record=json.loads(line)
+            titles=requests[record['custom_id']]
+            response=record['response']
+            if response.get('status_code')!=200:
+                return {}
+            results=self.parse(self.message_text(response['body']),len(titles))
+            # Batch jobs are billed too, so their tokens count towards the run that collects them
+            self.record_usage(response['body'])
+        except (TypeError,ValueError,KeyError,IndexError):
+            return {}
+        return {title:result for title,result in zip(titles,results) if result is not None}
+
+    async def submit_job(self,jsonl):
+        upload=(await self.request(
+            'POST','/files',
+            data={'purpose':'batch'},
+            files={'file':('tasks.jsonl',jsonl.encode('utf-8'),'application/jsonl')},
+        )).json()
+        batch=(await self.request(
+            'POST','/batches',
+            json={'input_file_id':upload['id'],'endpoint':'/v1/chat/completions','completion_window':OPENAI_BATCH_WINDOW},
+        )).json()
+        return batch['id']
 
-    def get_category():
-        return 
\ No newline at end of file
+    def flush(self):
+        # Submits what this run queued as one job per model and saves the job state
+        if not self.deferred:
+            return None
+        submitted=0
+        for model,titles in self.batches.drain().items():
+            requests={}
+            lines=[]
+            for start in range(0,len(titles),self.batch_size):
+                custom_id=f'tasks-{start//self.batch_size}'
+                requests[custom_id]=titles[start:start+self.batch_size]
+                lines.append(json.dumps({
+                    'custom_id':custom_id,
+                    'method':'POST',
+                    'url':'/v1/chat/completions',
+                    'body':self.chat_body(model,self.prompts.payload(requests[custom_id]),BatchResponse),
+                }))
+            try:
+                with TRACER.span('llm.batch_submit',model=model,tasks=len(titles)):
+                    job_id=self.run(self.submit_job('\n'.join(lines)+'\n'))
+            except Exception:
+                # Not pending, so the next run queues these titles again
+                TRACER.count('llm.batch_errors')
+                continue
+            self.batches.add_job(job_id,model,requests)
+            submitted+=len(titles)
+        self.batches.save()
+        # A long-running process (--watch) polls the jobs again on its next run
+        self._collected=False
+        return {'submitted':submitted,**self.batches.stats()}
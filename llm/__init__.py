@@ -1,13 +1,25 @@
-from llm.Gemini.provider import GeminiProvider
-from llm.OpenAI.provider import OpenAIProvider
-from config.constants import GEMINI_API_LABEL,OPENAI_API_LABEL,GEMINI_MODEL_LABEL,OPENAI_MODEL_LABEL
+from config.constants import (GEMINI_API_LABEL,OPENAI_API_LABEL,GEMINI_MODEL_LABEL,OPENAI_MODEL_LABEL,BATCH_SIZE_LABEL,DEFAULT_BATCH_SIZE,GEMINI_BASE_URL_LABEL,
+                              OPENAI_BASE_URL_LABEL,OPENAI_DEFERRED_LABEL,LLM_RPM,LLM_TPM,LLM_RPM_LABEL,LLM_TPM_LABEL)
 
 class GetProvider:
     @staticmethod
     def return_provider(model,env):
+        # Provider modules are imported on demand so only the selected SDK is loaded
+        from llm.scheduler import RequestScheduler
         if model== GEMINI_MODEL_LABEL:
-            return (GeminiProvider(env.get(GEMINI_API_LABEL)),env.get(GEMINI_MODEL_LABEL))
+            from llm.Gemini.provider import GeminiProvider
+            provider,model_name=GeminiProvider(env.get(GEMINI_API_LABEL),env.get(BATCH_SIZE_LABEL) or DEFAULT_BATCH_SIZE,env.get(GEMINI_BASE_URL_LABEL)),env.get(GEMINI_MODEL_LABEL)
         elif model ==OPENAI_MODEL_LABEL:
-            return (OpenAIProvider(env.get(OPENAI_API_LABEL)),OPENAI_MODEL_LABEL)
+            from llm.OpenAI.provider import OpenAIProvider
+            deferred=str(env.get(OPENAI_DEFERRED_LABEL) or '').lower() in ('1','true','yes')
+            provider,model_name=OpenAIProvider(
+                env.get(OPENAI_API_LABEL),env.get(BATCH_SIZE_LABEL) or DEFAULT_BATCH_SIZE,env.get(OPENAI_BASE_URL_LABEL),deferred=deferred
+            ),env.get(OPENAI_MODEL_LABEL)
         else:
             raise ValueError(f"Unsupported model: {model}")
+        scheduler=RequestScheduler(
+            provider,
+            requests_per_minute=float(env.get(LLM_RPM_LABEL) or LLM_RPM),
+            tokens_per_minute=float(env.get(LLM_TPM_LABEL) or LLM_TPM),
+        )
+        return (scheduler,model_name)
@@ -1,12 +1,61 @@
 from abc import ABC
-from llm.base_response import BaseResponse
+from typing import List
+from llm.base_response import BaseResponse,BatchResponse
+from config.constants import DIFFICULTIES
+from instrumentation import TRACER
+
+import json
+
+
 class BaseProvider(ABC):
     def __init__(self):
         raise NotImplementedError("Subclasses must implement this method")
 
-    def get_category(self, prompt: str, context: str) -> BaseResponse | None:
+    def generate(self, model: str, contents: str, schema, size: int) -> str:
+        # Transport only: sends the numbered task lines, returns the answer text
         raise NotImplementedError("Subclasses must implement this method")
 
+    def get_category(self, task: str, model: str) -> dict | None:
+        return self.get_categories([task], model)[0]
+
+    def get_categories(self, tasks: List[str], model: str) -> List[dict | None]:
+        # Tasks the answer dropped, duplicated or mangled come back as None. The
+        # scheduler asks again for those, within its budgets; providers never fan out.
+        if not tasks:
+            return []
+        schema = BatchResponse if len(tasks) > 1 else BaseResponse
+        results = self.parse(self.generate(model, self.prompts.payload(tasks), schema, len(tasks)), len(tasks))
+        TRACER.count('llm.batch_misses', results.count(None))
+        return results
+
+    def parse(self, text: str, size: int) -> List[dict | None]:
+        try:
+            classified = json.loads(text)['classified']
+        except (TypeError, ValueError, KeyError):
+            classified = []
+        if size == 1 and isinstance(classified, list) and classified and isinstance(classified[-1], dict):
+            # The single-task schema carries no ids
+            classified = [{**classified[-1], 'id': 0}]
+        return self.match_batch(classified, size)
+
+    def flush(self) -> None:
+        # Called once at the end of a run; providers that defer work submit it here
+        return None
+
+    def match_batch(self, classified, size: int) -> List[dict | None]:
+        # Maps a batch answer back to task positions, dropping duplicates and invalid labels
+        results = [None] * size
+        for item in classified if isinstance(classified, list) else []:
+            if not isinstance(item, dict):
+                continue
+            idx = item.get('id')
+            if not isinstance(idx, int) or not 0 <= idx < size or results[idx] is not None:
+                continue
+            if item.get('category') not in self.categories or item.get('diificulty') not in DIFFICULTIES:
+                continue
+            results[idx] = {'category': item['category'], 'diificulty': item['diificulty']}
+        return results
+
 
 class ProviderQuestionClass(ABC):
     @staticmethod
@@ -7,4 +7,9 @@ class Category(BaseModel):
 
 class BaseResponse(BaseModel):
     classified:List[Category]
-    
+
+class BatchCategory(Category):
+    id: int
+
+class BatchResponse(BaseModel):
+    classified:List[BatchCategory]
@@ -0,0 +1,90 @@
+from config.constants import CLASSIFICATION_CACHE,CACHE_MAX_ENTRIES,SCHEME_VERSION
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ClassificationCache:
+    def __init__(self,path=CLASSIFICATION_CACHE,max_entries=CACHE_MAX_ENTRIES):
+        self.path=path
+        self.max_entries=max_entries
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+        self.dirty=False
+        self.lock=threading.Lock()
+        self.entries=OrderedDict()
+        self.load()
+
+    @staticmethod
+    def normalize(title):
+        return ' '.join(str(title).lower().split())
+
+    @staticmethod
+    def make_key(title,categories,model):
+        raw=json.dumps([ClassificationCache.normalize(title),sorted(categories),model,SCHEME_VERSION])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path,'r') as f:
+                data=json.load(f)
+        except (OSError,ValueError):
+            # A corrupt cache is only a cold start, never a failed run
+            return
+        # Entries are stored least recently used first
+        for key,value in data.get('entries',[]):
+            self.entries[key]=value
+        self.evict()
+
+    def get(self,title,categories,model):
+        key=self.make_key(title,categories,model)
+        with self.lock:
+            value=self.entries.get(key)
+            if value is None:
+                self.misses+=1
+                return None
+            self.entries.move_to_end(key)
+            self.hits+=1
+            return value
+
+    def put(self,title,categories,model,value):
+        if not value:
+            return
+        key=self.make_key(title,categories,model)
+        with self.lock:
+            self.entries[key]=value
+            self.entries.move_to_end(key)
+            self.dirty=True
+            self.evict()
+
+    def evict(self):
+        while len(self.entries)>self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions+=1
+            self.dirty=True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path=self.path+'.tmp'
+            with open(tmp_path,'w') as f:
+                json.dump({'entries':list(self.entries.items())},f)
+            os.replace(tmp_path,self.path)
+            self.dirty=False
+
+    def stats(self):
+        lookups=self.hits+self.misses
+        return {
+            'hits':self.hits,
+            'misses':self.misses,
+            'evictions':self.evictions,
+            'size':len(self.entries),
+            'hit_rate':round(self.hits/lookups,3) if lookups else 0.0,
+        }
@@ -0,0 +1,157 @@
+from llm.base_provider import BaseProvider
+from llm.cache import ClassificationCache
+from config.constants import LOCAL_CONFIDENCE,LOCAL_MIN_SAMPLES,LOCAL_AUDIT_RATE
+
+import re
+import math
+import random
+import threading
+from collections import Counter, defaultdict
+
+TOKEN=re.compile(r'[a-z0-9]+')
+
+
+class NaiveBayes:
+    # Multinomial naive Bayes over title tokens with Laplace smoothing, updated one example at a time
+    def __init__(self,alpha=1.0):
+        self.alpha=alpha
+        self.class_counts=Counter()
+        self.token_counts=defaultdict(Counter)
+        self.token_totals=Counter()
+        self.vocabulary=set()
+
+    def learn(self,tokens,label):
+        self.class_counts[label]+=1
+        self.token_counts[label].update(tokens)
+        self.token_totals[label]+=len(tokens)
+        self.vocabulary.update(tokens)
+
+    @property
+    def samples(self):
+        return sum(self.class_counts.values())
+
+    def predict(self,tokens):
+        known=[token for token in tokens if token in self.vocabulary]
+        if not known or not self.class_counts:
+            return None,0.0
+        vocabulary_size=len(self.vocabulary)
+        samples=self.samples
+        scores={}
+        for label,count in self.class_counts.items():
+            denominator=self.token_totals[label]+self.alpha*vocabulary_size
+            scores[label]=math.log(count/samples)+sum(
+                math.log((self.token_counts[label][token]+self.alpha)/denominator) for token in known
+            )
+        best=max(scores,key=scores.get)
+        # Posterior of the best label, normalised over every label
+        total=sum(math.exp(score-scores[best]) for score in scores.values())
+        return best,1.0/total
+
+
+class LocalTierProvider(BaseProvider):
+    # Answers titles the local model is confident about and escalates the rest to the wrapped provider
+    def __init__(self,provider,threshold=LOCAL_CONFIDENCE,min_samples=LOCAL_MIN_SAMPLES,audit_rate=LOCAL_AUDIT_RATE):
+        self.provider=provider
+        self.threshold=threshold
+        self.min_samples=min_samples
+        self.audit_rate=audit_rate
+        self.category_model=NaiveBayes()
+        self.difficulty_model=NaiveBayes()
+        self.lock=threading.Lock()
+        self.counters={'local':0,'escalated':0,'compared':0,'agreed':0}
+        # Titles whose latest answer is a local guess rather than the LLM's
+        self.local_titles=set()
+
+    @property
+    def categories(self):
+        return self.provider.categories
+
+    @property
+    def batch_size(self):
+        return getattr(self.provider,'batch_size',1)
+
+    def stats(self):
+        with self.lock:
+            stats=dict(self.counters)
+        answered=stats['local']+stats['escalated']
+        stats['escalation_rate']=round(stats['escalated']/answered,3) if answered else 0.0
+        stats['agreement']=round(stats['agreed']/stats['compared'],3) if stats['compared'] else None
+        stats['samples']=self.category_model.samples
+        return stats
+
+    def answered_locally(self,title):
+        # Callers keep these out of the LLM cache and the fingerprints, so a run
+        # without the tier (or with a higher threshold) still asks the LLM
+        with self.lock:
+            return title in self.local_titles
+
+    @staticmethod
+    def tokens(title):
+        normalized=ClassificationCache.normalize(title)
+        # The whole title is a feature too, so repeated tasks are recognised outright
+        return TOKEN.findall(normalized)+['title:'+normalized]
+
+    def train_from_tracker(self,tracker):
+        for dates in tracker.values():
+            for tasks in dates.values():
+                for task in tasks:
+                    if task.get('category') in self.categories and task.get('difficulty'):
+                        self.learn(task['title'],task['category'],task['difficulty'])
+
+    def learn(self,title,category,difficulty):
+        tokens=self.tokens(title)
+        with self.lock:
+            self.category_model.learn(tokens,category)
+            self.difficulty_model.learn(tokens,difficulty)
+
+    def predict(self,title):
+        tokens=self.tokens(title)
+        with self.lock:
+            if self.category_model.samples<self.min_samples:
+                return None,0.0
+            category,category_confidence=self.category_model.predict(tokens)
+            difficulty,difficulty_confidence=self.difficulty_model.predict(tokens)
+        if category is None or difficulty is None:
+            return None,0.0
+        return {'category':category,'diificulty':difficulty},min(category_confidence,difficulty_confidence)
+
+    def get_category(self,task,model):
+        return self.get_categories([task],model)[0]
+
+    def get_categories(self,tasks,model):
+        results=[None]*len(tasks)
+        guesses={}
+        escalate=[]
+        for idx,task in enumerate(tasks):
+            guess,confidence=self.predict(task)
+            if guess is not None and confidence>=self.threshold:
+                results[idx]=guess
+                # A small sample of confident answers is still checked against the LLM
+                if random.random()>=self.audit_rate:
+                    continue
+            if guess is not None:
+                guesses[idx]=guess
+            escalate.append(idx)
+
+        answers=self.provider.get_categories([tasks[idx] for idx in escalate],model) if escalate else []
+        counts=Counter()
+        for idx,answer in zip(escalate,answers):
+            if not answer:
+                # An audited task keeps its local answer when the LLM call fails
+                continue
+            if idx in guesses:
+                counts['compared']+=1
+                counts['agreed']+=guesses[idx]['category']==answer.get('category')
+            counts['escalated']+=1
+            results[idx]=answer
+            if answer.get('category') in self.categories and answer.get('diificulty'):
+                self.learn(tasks[idx],answer['category'],answer['diificulty'])
+        answered_by_llm={idx for idx,answer in zip(escalate,answers) if answer}
+        local={idx for idx,result in enumerate(results) if result is not None and idx not in answered_by_llm}
+        counts['local']+=len(local)
+        with self.lock:
+            for name,amount in counts.items():
+                self.counters[name]+=amount
+            self.local_titles.update(tasks[idx] for idx in local)
+            self.local_titles.difference_update(tasks[idx] for idx in answered_by_llm)
+        return results
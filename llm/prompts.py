@@ -0,0 +1,59 @@
+from config.constants import INSTRUCTIONS,DEFAULT_CATEGORIES
+from instrumentation import TRACER
+
+import threading
+
+
+class PromptLayer:
+    # The instructions and categories never change within a run, so providers
+    # send them once as a system context and each request carries only the
+    # numbered task lines
+    def __init__(self,categories=DEFAULT_CATEGORIES):
+        self.categories=categories
+        self.system=INSTRUCTIONS.format(categories=categories)
+
+    @staticmethod
+    def payload(tasks):
+        return '\n'.join(f'{idx}: {task}' for idx,task in enumerate(tasks))
+
+    def estimate_tokens(self,tasks):
+        # Rough chars/4 estimate; providers do not expose a tokenizer up front
+        return (len(self.system)+len(self.payload(tasks)))//4
+
+
+class TokenUsage:
+    # Prompt, cached and response token counts as reported by the provider,
+    # totalled per run. Each call's counts also go on its llm.request span.
+    def __init__(self):
+        self.lock=threading.Lock()
+        self.calls=0
+        self.prompt=0
+        self.cached=0
+        self.response=0
+
+    def record(self,prompt,response,cached=0,span=None):
+        prompt,response,cached=int(prompt or 0),int(response or 0),int(cached or 0)
+        with self.lock:
+            self.calls+=1
+            self.prompt+=prompt
+            self.response+=response
+            self.cached+=cached
+        if span is not None:
+            span.set('prompt_tokens',prompt)
+            span.set('response_tokens',response)
+            span.set('cached_tokens',cached)
+        TRACER.count('llm.prompt_tokens',prompt)
+        TRACER.count('llm.response_tokens',response)
+        TRACER.count('llm.cached_tokens',cached)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls':self.calls,
+                'prompt_tokens':self.prompt,
+                'cached_tokens':self.cached,
+                'response_tokens':self.response,
+                'prompt_per_call':round(self.prompt/self.calls,1) if self.calls else 0.0,
+                'response_per_call':round(self.response/self.calls,1) if self.calls else 0.0,
+                'cached_rate':round(self.cached/self.prompt,3) if self.prompt else 0.0,
+            }
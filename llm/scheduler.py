@@ -0,0 +1,248 @@
+from llm.base_provider import BaseProvider
+from instrumentation import TRACER
+from llm.prompts import PromptLayer
+from config.constants import (LLM_RPM,LLM_TPM,LLM_MAX_RETRIES,LLM_BACKOFF_BASE,LLM_BACKOFF_MAX,
+                              LLM_BREAKER_THRESHOLD,LLM_BREAKER_RESET,RETRYABLE_STATUS)
+
+import re
+import time
+import random
+import threading
+
+RETRY_DELAY=re.compile(r"retryDelay'?\"?\s*[:=]\s*'?\"?(\d+(?:\.\d+)?)s")
+
+
+class TokenBucket:
+    def __init__(self,per_minute):
+        self.capacity=float(per_minute)
+        self.rate=self.capacity/60.0
+        self.level=self.capacity
+        self.updated=time.monotonic()
+        self.lock=threading.Lock()
+
+    def acquire(self,amount=1.0):
+        # Requests larger than the whole bucket still go through once it is full
+        amount=min(float(amount),self.capacity)
+        waited=0.0
+        while True:
+            with self.lock:
+                now=time.monotonic()
+                self.level=min(self.capacity,self.level+(now-self.updated)*self.rate)
+                self.updated=now
+                if self.level>=amount:
+                    self.level-=amount
+                    return waited
+                delay=(amount-self.level)/self.rate
+            time.sleep(delay)
+            waited+=delay
+
+    def drain(self):
+        # A 429 means the budget is higher than the provider allows right now,
+        # so every caller waits for the bucket to refill before the next request
+        with self.lock:
+            self.level=min(self.level,0.0)
+            self.updated=time.monotonic()
+
+
+class CircuitBreaker:
+    # Opens after `threshold` calls failed with every retry spent. While open,
+    # callers wait instead of failing; once reset_timeout has passed one trial
+    # request goes through (half-open) and its outcome closes or reopens it.
+    def __init__(self,threshold=LLM_BREAKER_THRESHOLD,reset_timeout=LLM_BREAKER_RESET):
+        self.threshold=threshold
+        self.reset_timeout=reset_timeout
+        self.failures=0
+        self.opened_at=None
+        self.trial=False
+        self.condition=threading.Condition()
+
+    def acquire(self):
+        # Returns (is_trial, seconds waited)
+        waited=0.0
+        with self.condition:
+            while self.opened_at is not None:
+                remaining=self.reset_timeout-(time.monotonic()-self.opened_at)
+                if remaining<=0 and not self.trial:
+                    self.trial=True
+                    return True,waited
+                start=time.monotonic()
+                # A trial in flight wakes the waiters when it records its outcome
+                self.condition.wait(remaining if remaining>0 else None)
+                waited+=time.monotonic()-start
+            return False,waited
+
+    def record(self,success,trial=False):
+        with self.condition:
+            if trial:
+                self.trial=False
+            if success:
+                self.failures=0
+                self.opened_at=None
+            elif trial:
+                self.opened_at=time.monotonic()
+            else:
+                self.failures+=1
+                if self.failures>=self.threshold:
+                    self.opened_at=time.monotonic()
+            self.condition.notify_all()
+
+    def release(self,trial):
+        # A trial that ended without saying anything about the provider's health
+        # (a throttle, an unparseable answer) lets the next waiter try instead
+        if not trial:
+            return
+        with self.condition:
+            self.trial=False
+            self.condition.notify_all()
+
+    @property
+    def open(self):
+        return self.opened_at is not None
+
+
+class RequestScheduler(BaseProvider):
+    # Wraps any provider with request/token budgets, retries and a circuit breaker.
+    # Calls that still fail after every retry return None so one bad task does
+    # not sink the run; while the breaker is open, calls wait for it instead.
+    def __init__(self,provider,requests_per_minute=LLM_RPM,tokens_per_minute=LLM_TPM,max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE,backoff_max=LLM_BACKOFF_MAX,breaker=None):
+        self.provider=provider
+        self.requests=TokenBucket(requests_per_minute)
+        self.tokens=TokenBucket(tokens_per_minute)
+        self.max_retries=max_retries
+        self.backoff_base=backoff_base
+        self.backoff_max=backoff_max
+        self.breaker=breaker or CircuitBreaker()
+        self.lock=threading.Lock()
+        self.counters={'calls':0,'tasks':0,'retries':0,'throttled':0,'failures':0,'held':0}
+        self.waited=0.0
+        self.started=None
+        self.default_prompts=PromptLayer()
+
+    @property
+    def categories(self):
+        return self.provider.categories
+
+    @property
+    def batch_size(self):
+        return getattr(self.provider,'batch_size',1)
+
+    def get_category(self,task,model):
+        return self.call(self.provider.get_category,[task],model,task)
+
+    def get_categories(self,tasks,model):
+        # Deferred answers come from a finished batch job, not a request, so no budget applies
+        if getattr(self.provider,'deferred',False):
+            return self.provider.get_categories(tasks,model)
+        result=self.call(self.provider.get_categories,tasks,model,tasks)
+        if result is None:
+            return [None]*len(tasks)
+        # Tasks the batch answer dropped or mangled get one more request, under the same budgets
+        missing=[idx for idx,answer in enumerate(result) if answer is None]
+        if missing and len(tasks)>1:
+            TRACER.count('llm.batch_fallbacks',len(missing))
+            retried=self.call(self.provider.get_categories,[tasks[idx] for idx in missing],model,[tasks[idx] for idx in missing])
+            for idx,answer in zip(missing,retried or []):
+                result[idx]=answer
+        return result
+
+    def flush(self):
+        # Providers that are not BaseProvider subclasses (the benchmark fakes) have nothing to flush
+        flush=getattr(self.provider,'flush',None)
+        return flush() if flush else None
+
+    @property
+    def usage(self):
+        return getattr(self.provider,'usage',None)
+
+    def estimate_tokens(self,tasks):
+        prompts=getattr(self.provider,'prompts',None) or self.default_prompts
+        return prompts.estimate_tokens(tasks)
+
+    def call(self,method,tasks,model,payload):
+        with self.lock:
+            if self.started is None:
+                self.started=time.monotonic()
+        for attempt in range(self.max_retries+1):
+            trial,held=self.breaker.acquire()
+            if held:
+                self.count('held',waited=held)
+            waited=self.requests.acquire()+self.tokens.acquire(self.estimate_tokens(tasks))
+            self.count('calls',waited=waited)
+            start=time.perf_counter()
+            try:
+                result=method(payload,model)
+            except Exception as exc:
+                TRACER.observe('llm.latency',time.perf_counter()-start)
+                status=self.status_of(exc)
+                retryable=self.retryable(exc,status)
+                final=not retryable or attempt==self.max_retries
+                if status==429:
+                    # Throttling says the budget is too high, not that the provider is down
+                    self.count('throttled')
+                    self.requests.drain()
+                    self.breaker.release(trial)
+                elif status is None and not retryable:
+                    # An unparseable answer; the provider itself responded
+                    self.breaker.release(trial)
+                elif trial or final:
+                    # Retries in progress only count once they are all spent; a failed trial reopens
+                    self.breaker.record(False,trial)
+                if final:
+                    self.count('failures')
+                    return None
+                self.count('retries')
+                time.sleep(self.backoff(attempt,self.retry_after(exc)))
+                continue
+            TRACER.observe('llm.latency',time.perf_counter()-start)
+            self.breaker.record(True,trial)
+            self.count('tasks',len(tasks))
+            return result
+        return None
+
+    def count(self,name,amount=1,waited=0.0):
+        with self.lock:
+            self.counters[name]+=amount
+            self.waited+=waited
+        TRACER.count('llm.'+name,amount)
+
+    @staticmethod
+    def status_of(exc):
+        status=getattr(exc,'code',None) or getattr(exc,'status_code',None)
+        if status is None and getattr(exc,'response',None) is not None:
+            status=getattr(exc.response,'status_code',None)
+        return status if isinstance(status,int) else None
+
+    @staticmethod
+    def retryable(exc,status):
+        if status is not None:
+            return status in RETRYABLE_STATUS
+        # Unparseable answers will not improve on retry; transport errors might
+        return not isinstance(exc,(ValueError,KeyError,TypeError,IndexError))
+
+    @staticmethod
+    def retry_after(exc):
+        response=getattr(exc,'response',None)
+        headers=getattr(response,'headers',None) or {}
+        value=headers.get('retry-after') if hasattr(headers,'get') else None
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        match=RETRY_DELAY.search(str(getattr(exc,'details','') or exc))
+        return float(match.group(1)) if match else None
+
+    def backoff(self,attempt,retry_after=None):
+        # Full jitter on top of exponential backoff, never shorter than the server's hint
+        delay=random.uniform(0,min(self.backoff_max,self.backoff_base*2**attempt))
+        return max(delay,retry_after or 0.0)
+
+    def stats(self):
+        with self.lock:
+            elapsed=time.monotonic()-self.started if self.started else 0.0
+            stats=dict(self.counters)
+            stats['waited']=round(self.waited,3)
+            stats['throughput']=round(stats['tasks']/elapsed*60,1) if elapsed else 0.0
+            stats['circuit']='open' if self.breaker.open else 'closed'
+            return stats
@@ -1,32 +1,23 @@
-from pathlib import Path
-from dotenv import dotenv_values
-
-import os.path
-import pickle
 import argparse
-import ast
 
+# Only stdlib and constants at module level: heavy clients (Firebase, Google
+# APIs, genai) are imported by the code paths that need them so cheap
+# commands like --version and --list start fast
+from config.constants import (CONFIG_FILE,FETCH_CONCURRENCY,FETCH_CONCURRENCY_LABEL,FIRESTORE_LAYOUT_LABEL,LOCAL_CONFIDENCE,LOCAL_CONFIDENCE_LABEL,PROFILE_TRACE,
+                              WATCH_INTERVAL,WATCH_INTERVAL_LABEL,HEALTH_PORT,HEALTH_PORT_LABEL)
 
-from config.setup import Setup
-from config.constants import CONFIG_FILE,LIST_TRACKER,SCOPES
-from llm import GetProvider
-import tasks 
-from tasks.getTasks import TrackerProvider
-from views.tasks_view import TaskView
-from views.setup_view import SetupView
-from utils import SaveUtils,Firebase
-import json
+VERSION='v0.1.0'
 
-if __name__ == '__main__':
-    firebase_obj=Firebase()
-    tracker_data = firebase_obj.get()
-    if tracker_data:
-        with open(LIST_TRACKER, 'w') as f:
-            json.dump(tracker_data, f)
-    tasks_obj=TrackerProvider()
-    setup_obj=Setup()
-    env=dotenv_values(Path.home()/CONFIG_FILE)
-    save_utils=SaveUtils()
+
+def iso_date(value):
+    from datetime import date
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a YYYY-MM-DD date, got {value!r}")
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description="CLI app to access Google Tasks")
     parser.add_argument(
         "-s",
@@ -46,20 +37,301 @@ if __name__ == '__main__':
         action='store_true',
         help="Add a list to be tracked"
     )
-    parser.add_argument('--version', action='version', version='v0.1.0')
-    
+    parser.add_argument(
+        "--full-resync",
+        action='store_true',
+        help="Ignore the stored sync watermarks and re-fetch every task"
+    )
+    parser.add_argument(
+        "--pipeline",
+        action='store_true',
+        help="Stream tasks through fetch, classification and merge with asyncio"
+    )
+    parser.add_argument(
+        "--stream",
+        action='store_true',
+        help="Classify and merge one page at a time to keep memory bounded by the page size"
+    )
+    parser.add_argument(
+        "--local-classifier",
+        action='store_true',
+        help="Answer confident tasks with a local model trained on the tracker and only send the rest to the LLM"
+    )
+    parser.add_argument(
+        "--offline",
+        action='store_true',
+        help="Work on the local tracker only and leave changes pending for the next sync"
+    )
+    parser.add_argument(
+        "--sync",
+        action='store_true',
+        help="Only reconcile the local tracker with Firebase"
+    )
+    parser.add_argument(
+        "--watch",
+        action='store_true',
+        help="Keep running and poll for changed tasks, with clients kept warm between polls"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help=f"Seconds between --watch polls (default {WATCH_INTERVAL}, or {WATCH_INTERVAL_LABEL} in ~/.habit)"
+    )
+    parser.add_argument(
+        "--health-port",
+        type=int,
+        help=f"Port for the --watch /healthz and /metrics endpoint (default {HEALTH_PORT}, 0 disables it)"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="Run every user in a JSON manifest in one process with shared LLM workers and cache"
+    )
+    parser.add_argument(
+        "--authorize",
+        metavar="USER",
+        help="With --batch, sign USER in to Google Tasks once so nightly runs are unattended"
+    )
+    parser.add_argument(
+        "--storage",
+        choices=['json','columnar'],
+        help="Convert the local tracker history to this storage format"
+    )
+    parser.add_argument(
+        "--export-json",
+        metavar="PATH",
+        help="Write the full tracker, history included, as JSON to PATH"
+    )
+    parser.add_argument(
+        "--stats",
+        action='store_true',
+        help="Summarize the local tracker history: categories, rolling counts, streaks and weekdays"
+    )
+    parser.add_argument(
+        "--since",
+        type=iso_date,
+        metavar="YYYY-MM-DD",
+        help="With --stats, start of the date range (inclusive)"
+    )
+    parser.add_argument(
+        "--until",
+        type=iso_date,
+        metavar="YYYY-MM-DD",
+        help="With --stats, end of the date range (inclusive, default today)"
+    )
+    parser.add_argument(
+        "--profile",
+        action='store_true',
+        help="Time every stage and print a summary; the trace is written to --trace"
+    )
+    parser.add_argument(
+        "--trace",
+        default=PROFILE_TRACE,
+        help="Where --profile writes the JSON trace"
+    )
+    parser.add_argument('--version', action='version', version=VERSION)
+    return parser
+
+
+def firebase_factory(profile=None):
+    from pathlib import Path
+    from dotenv import dotenv_values
+    from utils import Firebase
+    layout=dotenv_values(Path.home()/CONFIG_FILE).get(FIRESTORE_LAYOUT_LABEL)
+    if profile is None:
+        return Firebase(layout=layout)
+    return Firebase(layout=profile.firestore_layout or layout,cred_path=profile.firebase_credentials,app_name=profile.name)
+
+
+def run_batch(args):
+    from pathlib import Path
+    from dotenv import dotenv_values
+    from llm import GetProvider
+    from tasks.batch import BatchRunner
+    from views.tasks_view import TaskView
+
+    profiles,concurrency=BatchRunner.load_manifest(args.batch)
+    if args.authorize:
+        profile=next((profile for profile in profiles if profile.name==args.authorize),None)
+        if profile is None:
+            raise SystemExit(f"No user named {args.authorize} in {args.batch}")
+        BatchRunner.authorize(profile)
+        return
+
+    env=dotenv_values(Path.home()/CONFIG_FILE)
+    provider,model=GetProvider.return_provider(env.get("MODEL"),env)
+    runner=BatchRunner(
+        profiles,provider,model,remote_factory=firebase_factory,concurrency=concurrency,
+        fetch_concurrency=env.get(FETCH_CONCURRENCY_LABEL) or FETCH_CONCURRENCY,full_resync=args.full_resync,offline=args.offline
+    )
+    TaskView.display_batch_report(runner.run())
+    TaskView.display_cache_stats(runner.cache.stats())
+    TaskView.display_scheduler_stats(provider.stats())
+    deferred=provider.flush()
+    if provider.usage is not None:
+        TaskView.display_token_usage(provider.usage.stats())
+    if deferred is not None:
+        TaskView.display_deferred_batches(deferred)
+
+
+def run_watch(args,tasks_obj,syncer):
+    import signal
+    from pathlib import Path
+    from dotenv import dotenv_values
+    from llm import GetProvider
+    from utils import SaveUtils
+    from tasks.watch import WatchDaemon
+    from views.tasks_view import TaskView
+
+    # One provider for the life of the daemon, so its pooled HTTP client stays warm
+    env=dotenv_values(Path.home()/CONFIG_FILE)
     provider,model=GetProvider.return_provider(env.get("MODEL"),env)
-    args = parser.parse_args()
+    interval=args.interval or float(env.get(WATCH_INTERVAL_LABEL) or WATCH_INTERVAL)
+    port=args.health_port if args.health_port is not None else int(env.get(HEALTH_PORT_LABEL) or HEALTH_PORT)
+    daemon=WatchDaemon(
+        tasks_obj,provider,model,syncer=None if args.offline else syncer,save_factory=SaveUtils,interval=interval,
+        fetch_concurrency=env.get(FETCH_CONCURRENCY_LABEL) or FETCH_CONCURRENCY,
+        stats_sources={'llm':provider.stats,'cache':tasks_obj.cache.stats,'fingerprints':tasks_obj.fingerprints.stats,
+                       **({'tokens':provider.usage.stats} if provider.usage is not None else {})}
+    )
+    signal.signal(signal.SIGINT,daemon.stop)
+    signal.signal(signal.SIGTERM,daemon.stop)
+    server=daemon.serve(port) if port else None
+    TaskView.display_watch_started(interval,port)
+    try:
+        daemon.run()
+    finally:
+        if server is not None:
+            server.shutdown()
+    TaskView.display_watch_summary(daemon.metrics)
+
+
+def run_sync(syncer,outcome):
+    try:
+        outcome.update(syncer.sync())
+    except Exception as exc:
+        # Nothing was recorded, so the next run or --sync picks the changes up again
+        outcome['error']=str(exc)
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+
+    from pathlib import Path
+    from dotenv import dotenv_values
+    from tasks.getTasks import TrackerProvider
+    from views.tasks_view import TaskView
+    from instrumentation import TRACER
+
+    if args.profile:
+        TRACER.enable()
+    tasks_obj=TrackerProvider()
+    # Commands that only touch local files skip the sync and the run, and
+    # --batch works on the manifest's profiles instead of the default one
+    local_only=args.list or args.storage or args.export_json or args.batch or args.stats
+    if not local_only and not args.sync:
+        # Token and Tasks service load in the background while Firebase bootstraps
+        tasks_obj.services.warm()
+    if not local_only:
+        from storage.sync import TrackerSync
+        syncer=TrackerSync(firebase_factory)
+        if not args.offline:
+            with TRACER.span('bootstrap'):
+                syncer.bootstrap()
+    if args.setup or not local_only:
+        from config.setup import Setup
+        setup_obj=Setup()
     if args.add:
+        from views.setup_view import SetupView
         if tasks_obj.add_new_tracker(SetupView.ask_first_list()):
             pass
     if args.setup:
-        setup_obj.setup()         
+        setup_obj.setup()
     if args.list:
         TaskView.display_task_lists(tasks_obj.read_local_list())
-    if not args.list:
+    if args.storage:
+        from storage.columnar import TrackerFile
+        TaskView.display_storage_result(args.storage,TrackerFile().convert(args.storage))
+    if args.export_json:
+        from storage.columnar import TrackerFile
+        TrackerFile().export_json(args.export_json)
+    if args.stats:
+        from storage.analytics import TrackerArrays
+        try:
+            arrays=TrackerArrays.load()
+        except ImportError as exc:
+            raise SystemExit(str(exc))
+        TaskView.display_stats(arrays.summary(args.since,args.until))
+    if args.batch:
+        run_batch(args)
+    if args.sync and not local_only:
+        outcome={}
+        run_sync(syncer,outcome)
+        TaskView.display_sync_result(outcome)
+    elif args.watch and not local_only:
+        run_watch(args,tasks_obj,syncer)
+    elif not local_only:
+        import threading
+        from llm import GetProvider
+        from utils import SaveUtils
+
+        env=dotenv_values(Path.home()/CONFIG_FILE)
+        provider,model=GetProvider.return_provider(env.get("MODEL"),env)
+        scheduler=provider
+        save_utils=SaveUtils()
+        if args.local_classifier:
+            from llm.local_classifier import LocalTierProvider
+            provider=LocalTierProvider(scheduler,threshold=float(env.get(LOCAL_CONFIDENCE_LABEL) or LOCAL_CONFIDENCE))
+            from storage.columnar import TrackerFile
+            provider.train_from_tracker((TrackerFile().read() or {}).get('Tracker', {}))
         titles=tasks_obj.read_local_list()
-        response=tasks_obj.list_google_tasks(titles,provider,model)
-        save_utils.save(response,firebase_obj)
+        fetch_concurrency=env.get(FETCH_CONCURRENCY_LABEL) or FETCH_CONCURRENCY
+        response={}
+        mode='stream' if args.stream else 'pipeline' if args.pipeline else 'default'
+        with TRACER.span('run',mode=mode):
+            if args.stream:
+                save_utils.refresh()
+                summary={}
+                for list_name,page in tasks_obj.stream_google_tasks(titles,provider,model,full_resync=args.full_resync):
+                    save_utils.merge_page(list_name,page)
+                    counts=summary.setdefault(list_name,{'tasks':0,'completed':0,'pages':0})
+                    counts['pages']+=1
+                    counts['tasks']+=len(page)
+                    counts['completed']+=sum(1 for task in page if task['completed']!='Not complete')
+                save_utils.finish(watermarks=tasks_obj.watermarks)
+            elif args.pipeline:
+                from tasks.pipeline import TaskPipeline
+                summary=TaskPipeline(tasks_obj,provider,model,save_utils,fetch_concurrency=fetch_concurrency).run(titles,full_resync=args.full_resync)
+            else:
+                response=tasks_obj.list_google_tasks(titles,provider,model,full_resync=args.full_resync,fetch_concurrency=fetch_concurrency)
+                save_utils.save(response,watermarks=tasks_obj.watermarks)
+            tasks_obj.cache.save()
+            # Saved after the tracker, so a failed save leaves the tasks marked as changed
+            tasks_obj.fingerprints.save()
+            # Deferred providers submit the tasks they queued as a batch job
+            deferred=scheduler.flush()
+
+        # The push runs in the background while the results are rendered
+        outcome={'offline':args.offline}
+        sync_thread=threading.Thread(target=run_sync,args=(syncer,outcome))
+        if not args.offline:
+            sync_thread.start()
+        if args.stream or args.pipeline:
+            TaskView.display_stream_summary(summary)
         for t in response.keys():
-            TaskView.display_tasks(response[t])
\ No newline at end of file
+            TaskView.display_tasks(response[t])
+        TaskView.display_cache_stats(tasks_obj.cache.stats())
+        TaskView.display_fingerprint_stats(tasks_obj.fingerprints.stats())
+        TaskView.display_scheduler_stats(scheduler.stats())
+        if scheduler.usage is not None:
+            TaskView.display_token_usage(scheduler.usage.stats())
+        if deferred is not None:
+            TaskView.display_deferred_batches(deferred)
+        if args.local_classifier:
+            TaskView.display_local_tier_stats(provider.stats())
+        if not args.offline:
+            sync_thread.join()
+        TaskView.display_sync_result(outcome)
+    if args.profile:
+        TRACER.export(args.trace)
+        TaskView.display_profile(TRACER.summary(),args.trace)
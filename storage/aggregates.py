@@ -0,0 +1,142 @@
+from config.constants import AGGREGATES,HEATMAP_DAYS
+from storage.shards import ShardLayout
+
+import os
+import json
+import calendar
+from datetime import date, datetime, timezone
+
+
+class HeatmapAggregates:
+    # Rollups the app renders without downloading the history: per-day counts by
+    # list, category and difficulty, ISO week and month totals, and streaks.
+    # Only the days touched by a run are recomputed, and the weeks and months around them.
+    # The local file keeps every day; the published document only the last HEATMAP_DAYS.
+    def __init__(self,data=None,path=AGGREGATES):
+        self.path=path
+        data=data or {}
+        self.days=data.get('Days',{})
+        self.weeks=data.get('Weeks',{})
+        self.months=data.get('Months',{})
+        self.streaks=data.get('Streaks',{})
+        self.streak_all=data.get('Streak',self.streak([]))
+        self.updated_at=data.get('UpdatedAt')
+
+    @classmethod
+    def load(cls,path=AGGREGATES):
+        if not os.path.exists(path):
+            return cls(path=path)
+        try:
+            with open(path,'r') as f:
+                return cls(json.load(f),path)
+        except (OSError,ValueError):
+            # Rebuilt from the tracker on the next save
+            return cls(path=path)
+
+    @property
+    def empty(self):
+        return not self.days
+
+    @staticmethod
+    def day_key(ordinal):
+        return date.fromordinal(ordinal).isoformat()
+
+    @staticmethod
+    def week_key(ordinal):
+        year,week,_=date.fromordinal(ordinal).isocalendar()
+        return f'{year}-W{week:02d}'
+
+    @staticmethod
+    def month_key(ordinal):
+        return date.fromordinal(ordinal).strftime('%Y-%m')
+
+    @staticmethod
+    def count_day(store,ordinal):
+        entry={'total':0,'lists':{},'categories':{}}
+        for list_name,days in store.lists.items():
+            tasks=days.get(ordinal)
+            if not tasks:
+                continue
+            entry['total']+=len(tasks)
+            entry['lists'][list_name]=len(tasks)
+            for task in tasks.values():
+                difficulties=entry['categories'].setdefault(task.get('category'),{})
+                difficulties[task.get('difficulty')]=difficulties.get(task.get('difficulty'),0)+1
+        return entry
+
+    def update(self,store,touched):
+        ordinals={ordinal for _,ordinal in touched}
+        lists={list_name for list_name,_ in touched}
+        if not ordinals:
+            return False
+        for ordinal in ordinals:
+            entry=self.count_day(store,ordinal)
+            if entry['total']:
+                self.days[self.day_key(ordinal)]=entry
+            else:
+                self.days.pop(self.day_key(ordinal),None)
+
+        for ordinal in {date.fromisocalendar(*date.fromordinal(o).isocalendar()[:2],1).toordinal() for o in ordinals}:
+            total=sum(self.days.get(self.day_key(day),{}).get('total',0) for day in range(ordinal,ordinal+7))
+            self.set_total(self.weeks,self.week_key(ordinal),total)
+        for ordinal in {date.fromordinal(o).replace(day=1).toordinal() for o in ordinals}:
+            first=date.fromordinal(ordinal)
+            length=calendar.monthrange(first.year,first.month)[1]
+            total=sum(self.days.get(self.day_key(day),{}).get('total',0) for day in range(ordinal,ordinal+length))
+            self.set_total(self.months,self.month_key(ordinal),total)
+
+        for list_name in lists:
+            self.streaks[list_name]=self.streak(store.ordinals.get(list_name,[]))
+        self.streak_all=self.streak(sorted(date.fromisoformat(day).toordinal() for day in self.days))
+        self.updated_at=datetime.now(timezone.utc).isoformat()
+        return True
+
+    def rebuild(self,store):
+        self.days,self.weeks,self.months,self.streaks={},{},{},{}
+        self.streak_all=self.streak([])
+        self.update(store,{(list_name,ordinal) for list_name,ordinals in store.ordinals.items() for ordinal in ordinals})
+
+    @staticmethod
+    def set_total(totals,key,total):
+        if total:
+            totals[key]=total
+        else:
+            totals.pop(key,None)
+
+    @staticmethod
+    def streak(ordinals):
+        # 'current' is the run ending on the latest day; the app compares 'last' with today
+        if not ordinals:
+            return {'current':0,'longest':0,'last':None}
+        longest=run=1
+        for previous,ordinal in zip(ordinals,ordinals[1:]):
+            run=run+1 if ordinal==previous+1 else 1
+            longest=max(longest,run)
+        return {'current':run,'longest':longest,'last':date.fromordinal(ordinals[-1]).isoformat()}
+
+    def to_dict(self,window=HEATMAP_DAYS):
+        # Days covers `window` days up to the latest one, so the document stays the
+        # same size however long the history; None keeps every day (the local file).
+        # Totals, weeks, months and streaks always cover the whole history.
+        days=sorted(self.days.items())
+        if window is not None and days:
+            cutoff=self.day_key(date.fromisoformat(days[-1][0]).toordinal()-window+1)
+            days=[(day,entry) for day,entry in days if day>=cutoff]
+        return {
+            'Days':dict(days),
+            'Weeks':dict(sorted(self.weeks.items())),
+            'Months':dict(sorted(self.months.items())),
+            'Total':{'tasks':sum(entry['total'] for entry in self.days.values()),'days':len(self.days)},
+            'Streaks':self.streaks,
+            'Streak':self.streak_all,
+            'UpdatedAt':self.updated_at,
+        }
+
+    def fingerprint(self):
+        return ShardLayout.fingerprint({key:value for key,value in self.to_dict().items() if key!='UpdatedAt'})
+
+    def save(self):
+        tmp_path=self.path+'.tmp'
+        with open(tmp_path,'w') as f:
+            json.dump(self.to_dict(window=None),f)
+        os.replace(tmp_path,self.path)
@@ -0,0 +1,187 @@
+from config.constants import LIST_TRACKER,TRACKER_COLUMNS,DIFFICULTIES
+from storage.columnar import TrackerFile,ADD
+from storage.grouping import TaskGrouper
+
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WEEKDAYS=['Mon','Tue','Wed','Thu','Fri','Sat','Sun']
+ROLLING_WINDOWS=(7,30)
+
+
+class TrackerArrays:
+    # The tracker history as parallel arrays, one row per (list, day, title):
+    # day ordinals plus list, category and difficulty codes into `names`.
+    # Everything --stats shows is computed from these with vectorized numpy.
+    def __init__(self,ordinals,lists,categories,difficulties,names):
+        self.ordinals=ordinals
+        self.lists=lists
+        self.categories=categories
+        self.difficulties=difficulties
+        self.names=names
+
+    @classmethod
+    def load(cls,path=LIST_TRACKER,columns_path=TRACKER_COLUMNS):
+        if np is None:
+            raise ImportError('--stats needs numpy: pip install numpy')
+        tracker=TrackerFile(path,columns_path)
+        if tracker.columnar:
+            return cls.from_columns(tracker.columns)
+        return cls.from_tracker((tracker.read_meta() or {}).get('Tracker',{}))
+
+    @classmethod
+    def from_tracker(cls,tracker):
+        names={'lists':list(tracker),'categories':[],'difficulties':[]}
+        codes={'categories':{},'difficulties':{}}
+        parsed={}
+        ordinals,lists,categories,difficulties=[],[],[],[]
+
+        def encode(name,values):
+            lookup=codes[name]
+            result=[]
+            for value in values:
+                idx=lookup.get(value)
+                if idx is None:
+                    idx=lookup[value]=len(names[name])
+                    names[name].append(value)
+                result.append(idx)
+            return result
+
+        for list_id,dates in enumerate(tracker.values()):
+            for date_key,tasks in dates.items():
+                ordinal=parsed.get(date_key)
+                if ordinal is None:
+                    ordinal=parsed[date_key]=TaskGrouper.date_ordinal(date_key)
+                # A title counts once per list and day, as in TrackerStore
+                if len({task['title'] for task in tasks})<len(tasks):
+                    tasks=list({task['title']:task for task in reversed(tasks)}.values())[::-1]
+                ordinals.extend([ordinal]*len(tasks))
+                lists.extend([list_id]*len(tasks))
+                categories.extend(encode('categories',[task.get('category') for task in tasks]))
+                difficulties.extend(encode('difficulties',[task.get('difficulty') for task in tasks]))
+        return cls(*(np.array(values,dtype=np.int64) for values in (ordinals,lists,categories,difficulties)),names)
+
+    @classmethod
+    def from_columns(cls,columnar):
+        columns={name:np.asarray(values) for name,values in columnar.columns().items()}
+        ops=columns['ops']
+        keep=slice(None)
+        if len(ops) and not (ops==ADD).all():
+            # Rows are in write order and alternate add/remove per entry, so an
+            # entry exists when the last row for its (list, day, title) is an add
+            order=np.lexsort((np.arange(len(ops)),columns['titles'],columns['ordinals'],columns['lists']))
+            last=np.ones(len(order),dtype=bool)
+            for name in ('lists','ordinals','titles'):
+                values=columns[name][order]
+                last[:-1]&=values[1:]==values[:-1]
+            last=~last
+            last[-1]=True
+            keep=np.sort(order[last][ops[order[last]]==ADD])
+        index=columnar.dictionaries()
+        names={name:list(index[name]) for name in ('lists','categories','difficulties')}
+        return cls(
+            columns['ordinals'][keep].astype(np.int64),columns['lists'][keep].astype(np.int64),
+            columns['categories'][keep].astype(np.int64),columns['difficulties'][keep].astype(np.int64),names
+        )
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def between(self,since=None,until=None):
+        # since and until are day ordinals, both inclusive
+        mask=np.ones(len(self),dtype=bool)
+        if since is not None:
+            mask&=self.ordinals>=since
+        if until is not None:
+            mask&=self.ordinals<=until
+        return TrackerArrays(self.ordinals[mask],self.lists[mask],self.categories[mask],self.difficulties[mask],self.names)
+
+    @staticmethod
+    def streak(ordinals,end=None):
+        # Same shape as the heatmap aggregates: the run ending on the latest day, and the longest.
+        # A run that stopped before the day ahead of `end` is over, so the current streak is 0
+        days=np.unique(ordinals)
+        if not len(days):
+            return {'current':0,'longest':0,'last':None}
+        breaks=np.flatnonzero(np.diff(days)!=1)
+        starts=np.concatenate(([0],breaks+1))
+        ends=np.concatenate((breaks,[len(days)-1]))
+        lengths=ends-starts+1
+        current=int(lengths[-1]) if end is None or days[-1]>=end-1 else 0
+        return {'current':current,'longest':int(lengths.max()),'last':date.fromordinal(int(days[-1])).isoformat()}
+
+    def distribution(self):
+        width=max(1,len(self.names['difficulties']))
+        counts=np.bincount(self.categories*width+self.difficulties,minlength=len(self.names['categories'])*width)
+        counts=counts.reshape(-1,width)
+        # Known difficulties in their usual order, categories by volume; empty ones are left out
+        rank={difficulty:idx for idx,difficulty in enumerate(DIFFICULTIES)}
+        columns=sorted(np.flatnonzero(counts.sum(axis=0)),key=lambda idx: (rank.get(self.names['difficulties'][idx],len(rank)),str(self.names['difficulties'][idx])))
+        totals=counts.sum(axis=1)
+        return {
+            'difficulties':[self.names['difficulties'][idx] for idx in columns],
+            'rows':[
+                {'category':self.names['categories'][idx],'counts':counts[idx,columns].tolist(),'total':int(totals[idx])}
+                for idx in np.argsort(-totals,kind='stable')
+                if totals[idx]
+            ],
+        }
+
+    def rolling(self,start,end):
+        daily=np.bincount(self.ordinals-start,minlength=end-start+1)
+        cumulative=np.concatenate(([0],np.cumsum(daily)))
+        result=[]
+        for window in ROLLING_WINDOWS:
+            # windows[i] is the count over the `window` days ending on start+i
+            windows=cumulative[1:]-cumulative[np.maximum(0,np.arange(1,len(cumulative))-window)]
+            best=int(np.argmax(windows))
+            result.append({
+                'window':window,
+                'latest':int(windows[-1]),
+                'best':int(windows[best]),
+                'best_end':date.fromordinal(start+best).isoformat(),
+                'average':round(float(daily.mean())*window,1),
+            })
+        return result
+
+    def weekdays(self,start,end):
+        counts=np.bincount((self.ordinals-1)%7,minlength=7)
+        # How often each weekday occurs in the range, for a per-day average
+        occurrences=np.bincount((np.arange(start,end+1)-1)%7,minlength=7)
+        total=max(1,int(counts.sum()))
+        return [
+            {'day':day,'count':int(counts[idx]),'share':counts[idx]/total,'average':counts[idx]/max(1,occurrences[idx])}
+            for idx,day in enumerate(WEEKDAYS)
+        ]
+
+    def per_list(self,end=None):
+        counts=np.bincount(self.lists,minlength=len(self.names['lists']))
+        return [
+            {'list':name,'count':int(counts[idx]),**self.streak(self.ordinals[self.lists==idx],end)}
+            for idx,name in enumerate(self.names['lists'])
+            if counts[idx]
+        ]
+
+    def summary(self,since=None,until=None):
+        selected=self.between(since,until)
+        if not len(selected):
+            return None
+        start=since if since is not None else int(selected.ordinals.min())
+        # Without an end date the range runs to today, so rolling counts mean "the last N days"
+        end=until if until is not None else max(date.today().toordinal(),int(selected.ordinals.max()))
+        return {
+            'since':date.fromordinal(start).isoformat(),
+            'until':date.fromordinal(end).isoformat(),
+            'total':len(selected),
+            'active_days':int(len(np.unique(selected.ordinals))),
+            'days':end-start+1,
+            'streak':self.streak(selected.ordinals,end),
+            'lists':selected.per_list(end),
+            'distribution':selected.distribution(),
+            'rolling':selected.rolling(start,end),
+            'weekdays':selected.weekdays(start,end),
+        }
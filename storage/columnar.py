@@ -0,0 +1,265 @@
+from config.constants import LIST_TRACKER,TRACKER_COLUMNS,COLUMNAR_COMPACT_RATIO
+from storage.store import TrackerStore
+from storage.shards import ShardLayout
+
+import os
+import sys
+import json
+import glob
+import shutil
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Column name -> array typecode; files are little-endian regardless of the host
+COLUMNS={
+    'ops':'B',
+    'lists':'H',
+    'ordinals':'I',
+    'titles':'I',
+    'categories':'B',
+    'difficulties':'B',
+}
+DICTIONARIES=('lists','titles','categories','difficulties')
+INDEX='dictionaries.json'
+ADD,REMOVE=1,0
+
+
+class ColumnarTracker:
+    # The tracker history as one file per column plus a JSON index of the
+    # dictionaries: integer day ordinals, and list, title, category and
+    # difficulty ids. Runs append rows (removals are tombstones) and a full
+    # rewrite into a new generation compacts them once tombstones pile up.
+    def __init__(self,path=TRACKER_COLUMNS):
+        self.path=path
+        self.reload()
+
+    def reload(self):
+        # Another writer (the run's SaveUtils, a compaction) may have moved the
+        # row count or the generation since this object last read the index
+        self.index=self.read_index()
+        self.lookup={name:{value:idx for idx,value in enumerate(self.index[name])} for name in DICTIONARIES}
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path,INDEX)
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    def read_index(self):
+        if not os.path.exists(self.index_path):
+            return {'generation':0,'rows':0,'removed':0,**{name:[] for name in DICTIONARIES}}
+        with open(self.index_path,'r') as f:
+            return json.load(f)
+
+    def write_index(self):
+        # The index is replaced last, so rows past its count from an interrupted append are ignored
+        tmp_path=self.index_path+'.tmp'
+        with open(tmp_path,'w') as f:
+            json.dump(self.index,f)
+        os.replace(tmp_path,self.index_path)
+
+    def column_path(self,name,generation=None):
+        return os.path.join(self.path,f"{self.index['generation'] if generation is None else generation}.{name}")
+
+    def columns(self):
+        # Zero-copy memory maps with numpy, plain arrays otherwise
+        rows=self.index['rows']
+        result={}
+        for name,typecode in COLUMNS.items():
+            path=self.column_path(name)
+            if np is not None:
+                dtype=np.dtype(typecode).newbyteorder('<')
+                result[name]=np.memmap(path,dtype=dtype,mode='r',shape=(rows,)) if rows else np.zeros(0,dtype=dtype)
+            else:
+                values=array(typecode)
+                if rows:
+                    with open(path,'rb') as f:
+                        values.fromfile(f,rows)
+                    if sys.byteorder!='little':
+                        values.byteswap()
+                result[name]=values
+        return result
+
+    def dictionaries(self):
+        return {name:self.index[name] for name in DICTIONARIES}
+
+    def list_names(self):
+        return set(self.index['lists'])
+
+    def load_store(self):
+        columns=self.columns()
+        lists,titles,categories,difficulties=(self.index[name] for name in DICTIONARIES)
+        store=TrackerStore()
+        for list_name in lists:
+            store.ensure_list(list_name)
+        rows=zip(*(columns[name].tolist() for name in COLUMNS))
+        for op,list_id,ordinal,title_id,category_id,difficulty_id in rows:
+            if op==ADD:
+                store.add(lists[list_id],ordinal,{'title':titles[title_id],'category':categories[category_id],'difficulty':difficulties[difficulty_id]})
+            else:
+                store.remove_titles(lists[list_id],ordinal,{titles[title_id]})
+        store.touched=set()
+        # Changes from here on are appended by save()
+        store.journal=[]
+        return store
+
+    def encode(self,name,value):
+        idx=self.lookup[name].get(value)
+        if idx is None:
+            idx=self.lookup[name][value]=len(self.index[name])
+            self.index[name].append(value)
+        return idx
+
+    def encode_rows(self,rows):
+        columns={name:array(typecode) for name,typecode in COLUMNS.items()}
+        for op,list_name,ordinal,task in rows:
+            columns['ops'].append(op)
+            columns['lists'].append(self.encode('lists',list_name))
+            columns['ordinals'].append(ordinal)
+            columns['titles'].append(self.encode('titles',task['title']))
+            columns['categories'].append(self.encode('categories',task.get('category')))
+            columns['difficulties'].append(self.encode('difficulties',task.get('difficulty')))
+        return columns
+
+    def write_columns(self,columns,generation,mode):
+        written=0
+        for name,values in columns.items():
+            if sys.byteorder!='little':
+                values.byteswap()
+            path=self.column_path(name,generation)
+            with open(path,mode) as f:
+                if mode=='ab':
+                    # Drop rows an interrupted append left past the index
+                    f.truncate(self.index['rows']*values.itemsize)
+                values.tofile(f)
+            written+=len(values)*values.itemsize
+        return written
+
+    def save(self,store):
+        # Returns the number of bytes written
+        journal=store.journal or []
+        for list_name in store.lists:
+            self.encode('lists',list_name)
+        if not self.exists() or self.index['removed']>COLUMNAR_COMPACT_RATIO*max(1,self.index['rows']):
+            return self.write(store)
+        written=self.write_columns(self.encode_rows(journal),self.index['generation'],'ab')
+        self.index['rows']+=len(journal)
+        self.index['removed']+=sum(1 for op,*_ in journal if op==REMOVE)
+        self.write_index()
+        store.journal=[]
+        return written
+
+    def write(self,store):
+        # Full rewrite into a new generation; the old files go once the index points at it
+        os.makedirs(self.path,exist_ok=True)
+        previous=self.read_index()['generation'] if self.exists() else None
+        self.index={'generation':(previous or 0)+1,'rows':0,'removed':0,**{name:[] for name in DICTIONARIES}}
+        self.lookup={name:{} for name in DICTIONARIES}
+        for list_name in store.lists:
+            self.encode('lists',list_name)
+        rows=[
+            (ADD,list_name,ordinal,task)
+            for list_name,days in store.lists.items()
+            for ordinal in store.ordinals[list_name]
+            for task in days[ordinal].values()
+        ]
+        written=self.write_columns(self.encode_rows(rows),self.index['generation'],'wb')
+        self.index['rows']=len(rows)
+        self.write_index()
+        if previous is not None:
+            for path in glob.glob(os.path.join(self.path,f'{previous}.*')):
+                os.remove(path)
+        store.journal=[]
+        return written
+
+
+class TrackerFile:
+    # tracker.json always holds the list names and sync state. With the columnar
+    # format the 'Tracker' history lives in TRACKER_COLUMNS instead, and read()
+    # puts it back so sync and export see the same document either way.
+    def __init__(self,path=LIST_TRACKER,columns_path=TRACKER_COLUMNS):
+        self.path=path
+        self.columns=ColumnarTracker(columns_path)
+
+    @property
+    def columnar(self):
+        return self.columns.exists()
+
+    def read_meta(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path)==0:
+            return None
+        with open(self.path,'r') as f:
+            return json.load(f)
+
+    def load_store(self,data):
+        if self.columnar:
+            self.columns.reload()
+            return self.columns.load_store()
+        return TrackerStore.from_dict((data or {}).get('Tracker',{}))
+
+    def list_names(self,data):
+        if self.columnar:
+            self.columns.reload()
+            return self.columns.list_names()
+        return set((data or {}).get('Tracker',{}))
+
+    def stamp(self,data):
+        # Identifies the history on disk: any write to it, a pull or a restored copy changes it
+        if self.columnar:
+            self.columns.reload()
+            return f"{self.columns.index['generation']}.{self.columns.index['rows']}"
+        return ShardLayout.fingerprint((data or {}).get('Tracker',{}))
+
+    def read(self):
+        # Long-lived readers (TrackerSync, --watch) must see rows appended since they were built
+        data=self.read_meta()
+        if data is not None and self.columnar:
+            self.columns.reload()
+            data['Tracker']=self.columns.load_store().to_dict()
+        return data
+
+    def write_meta(self,data):
+        tmp_path=self.path+'.tmp'
+        with open(tmp_path,'w') as f:
+            json.dump(data,f)
+        os.replace(tmp_path,self.path)
+        return os.path.getsize(self.path)
+
+    def write(self,data,history=True):
+        # Replaces the whole tracker, e.g. after a pull. history=False only
+        # rewrites tracker.json, for when the history on disk is already current.
+        if self.columnar:
+            if history:
+                self.columns.write(TrackerStore.from_dict(data.get('Tracker',{})))
+            data={key:value for key,value in data.items() if key!='Tracker'}
+        return self.write_meta(data)
+
+    def save(self,data,store):
+        # Writes what a run changed; returns the number of bytes written
+        if self.columnar:
+            written=self.columns.save(store)
+            data.pop('Tracker',None)
+            return written+self.write_meta(data)
+        data['Tracker']=store.to_dict()
+        return self.write_meta(data)
+
+    def convert(self,storage):
+        data=self.read()
+        if data is None:
+            return False
+        if storage=='columnar':
+            self.columns.write(TrackerStore.from_dict(data.get('Tracker',{})))
+            data.pop('Tracker',None)
+        else:
+            shutil.rmtree(self.columns.path,ignore_errors=True)
+        self.write_meta(data)
+        return True
+
+    def export_json(self,path):
+        with open(path,'w') as f:
+            json.dump(self.read() or {},f)
@@ -0,0 +1,95 @@
+import copy
+import json
+
+
+class FakeSnapshot:
+    def __init__(self,doc_id,data):
+        self.id=doc_id
+        self._data=data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class FakeDocument:
+    def __init__(self,db,path):
+        self.db=db
+        self.path=path
+        self.id=path[-1]
+
+    def get(self):
+        self.db.reads+=1
+        return FakeSnapshot(self.id,self.db.docs.get(self.path))
+
+    def set(self,data,merge=False):
+        data=copy.deepcopy(data)
+        if merge and self.path in self.db.docs:
+            merged=self.db.docs[self.path]
+            merged.update(data)
+            data=merged
+        self.db.writes+=1
+        self.db.bytes_written+=len(json.dumps(data,default=str))
+        self.db.docs[self.path]=data
+
+    def delete(self):
+        self.db.deletes+=1
+        self.db.docs.pop(self.path,None)
+
+    def collection(self,name):
+        return FakeCollection(self.db,self.path+(name,))
+
+
+class FakeCollection:
+    def __init__(self,db,path):
+        self.db=db
+        self.path=path
+
+    def document(self,doc_id):
+        return FakeDocument(self.db,self.path+(doc_id,))
+
+    def stream(self):
+        for path,data in list(self.db.docs.items()):
+            if len(path)==len(self.path)+1 and path[:-1]==self.path:
+                self.db.reads+=1
+                yield FakeSnapshot(path[-1],copy.deepcopy(data))
+
+
+class FakeBatch:
+    def __init__(self,db):
+        self.db=db
+        self.ops=[]
+
+    def set(self,ref,data,merge=False):
+        self.ops.append((ref.set,(data,merge)))
+
+    def delete(self,ref):
+        self.ops.append((ref.delete,()))
+
+    def commit(self):
+        if len(self.ops)>500:
+            raise ValueError("A batch can contain at most 500 operations")
+        self.db.commits+=1
+        for op,args in self.ops:
+            op(*args)
+        self.ops=[]
+
+
+class FakeFirestore:
+    # Minimal in-memory stand-in for firestore.client(), for tests and benchmarks
+    def __init__(self):
+        self.docs={}
+        self.reads=0
+        self.writes=0
+        self.deletes=0
+        self.commits=0
+        self.bytes_written=0
+
+    def collection(self,name):
+        return FakeCollection(self,(name,))
+
+    def batch(self):
+        return FakeBatch(self)
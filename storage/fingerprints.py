@@ -0,0 +1,129 @@
+from config.constants import FINGERPRINTS
+from instrumentation import TRACER
+
+import os
+import json
+import hashlib
+import threading
+
+# Only the fields the tracker is built from; edits to notes, due dates or
+# positions bump 'updated' without changing anything downstream
+FIELDS=('id','title','status','completed')
+
+
+class TaskFingerprints:
+    # Content hashes per task and per list from the last run that merged them.
+    # Tasks whose hash is unchanged skip classification, grouping, merging and pruning.
+    # The file also holds the stamp of the tracker history they were merged into
+    # (TrackerFile.stamp), so a history replaced by a sync pull, a conflict merge
+    # or a restored backup discards them instead of hiding tasks it lacks.
+    def __init__(self,stored=None,path=FINGERPRINTS,tracker=None,stamp=None):
+        self.path=path
+        self.tracker=tracker
+        self.stored=stored or {}
+        self.stored_stamp=stamp
+        self.seen={}
+        self.full=set()
+        self.skipped=0
+        self.lock=threading.Lock()
+
+    @classmethod
+    def load(cls,tracker,path=FINGERPRINTS):
+        if not os.path.exists(path):
+            return cls(path=path,tracker=tracker)
+        try:
+            with open(path,'r') as f:
+                stored=json.load(f)
+            data=tracker.read_meta()
+        except (OSError,ValueError):
+            return cls(path=path,tracker=tracker)
+        stamp=tracker.stamp(data)
+        if not isinstance(stored.get('lists'),dict) or stored.get('tracker')!=stamp:
+            TRACER.count('fingerprints.discarded')
+            return cls(path=path,tracker=tracker)
+        # A list missing from the tracker was never merged, whatever the hashes say
+        tracked_lists=tracker.list_names(data)
+        return cls({list_name:value for list_name,value in stored['lists'].items() if list_name in tracked_lists},path,tracker,stamp)
+
+    @staticmethod
+    def task_hash(task):
+        raw='\x1f'.join(str(task.get(field, '')) for field in FIELDS)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def list_hash(task_hashes):
+        raw=json.dumps(sorted(task_hashes.items()))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def mark_full(self,list_name):
+        # Every task of the list is being fetched, so ids not seen again were deleted
+        with self.lock:
+            self.full.add(list_name)
+
+    def changed(self,list_name,tasks):
+        previous=self.stored.get(list_name,{}).get('tasks',{})
+        changed=[]
+        unchanged={}
+        for task in tasks:
+            task_id=task.get('id')
+            if task_id in previous and previous[task_id]==self.task_hash(task):
+                unchanged[task_id]=previous[task_id]
+            else:
+                changed.append(task)
+        with self.lock:
+            self.seen.setdefault(list_name,{}).update(unchanged)
+            self.skipped+=len(unchanged)
+        TRACER.count('fingerprints.unchanged',len(unchanged))
+        return changed
+
+    def record(self,list_name,tasks,outputs,provisional=None):
+        # Only tasks that made it into the tracker; the rest must be retried next run.
+        # So are provisional answers (local tier guesses), which a later run may escalate.
+        hashes={
+            task['id']:self.task_hash(task)
+            for task in tasks
+            if task.get('id') is not None and outputs.get(task.get('title', 'No Title'))
+            and not (provisional and provisional(task.get('title', 'No Title')))
+        }
+        with self.lock:
+            self.seen.setdefault(list_name,{}).update(hashes)
+
+    def to_dict(self):
+        with self.lock:
+            result={}
+            for list_name in self.stored.keys()|self.seen.keys():
+                tasks=dict(self.seen.get(list_name,{}))
+                if list_name not in self.full:
+                    tasks={**self.stored.get(list_name,{}).get('tasks',{}),**tasks}
+                result[list_name]={'hash':self.list_hash(tasks),'tasks':tasks}
+            return result
+
+    def unchanged_lists(self):
+        current=self.to_dict()
+        return {list_name for list_name,value in current.items() if self.stored.get(list_name,{}).get('hash')==value['hash']}
+
+    def stamp(self):
+        if self.tracker is None:
+            return None
+        try:
+            return self.tracker.stamp(self.tracker.read_meta())
+        except (OSError,ValueError):
+            return None
+
+    def save(self):
+        # Called after the tracker is saved, so the stamp covers what was merged
+        data={'tracker':self.stamp(),'lists':self.to_dict()}
+        if data['lists']==self.stored and data['tracker']==self.stored_stamp:
+            return
+        tmp_path=self.path+'.tmp'
+        with open(tmp_path,'w') as f:
+            json.dump(data,f)
+        os.replace(tmp_path,self.path)
+
+    def stats(self):
+        current=self.to_dict()
+        return {
+            'skipped':self.skipped,
+            'unchanged_lists':len(self.unchanged_lists()),
+            'lists':len(current),
+        }
@@ -0,0 +1,80 @@
+from config.constants import GROUPING_NUMPY_THRESHOLD
+
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NOT_COMPLETE='Not complete'
+
+
+class TaskGrouper:
+    @staticmethod
+    def date_ordinal(date_key):
+        # '%d-%m-%Y' without the strptime overhead
+        return date(int(date_key[6:]), int(date_key[3:5]), int(date_key[:2])).toordinal()
+
+    @staticmethod
+    def ordinals(items):
+        # Each distinct date string is parsed once, however many tasks share it
+        parsed={}
+        ordinals=[]
+        for x in items:
+            date_key=x['completed']
+            ordinal=parsed.get(date_key)
+            if ordinal is None:
+                ordinal=parsed[date_key]=TaskGrouper.date_ordinal(date_key)
+            ordinals.append(ordinal)
+        return ordinals
+
+    @staticmethod
+    def entry(x):
+        return {
+            'title': x['title'],
+            'category': x['llm_output']['category'],
+            'difficulty': x['llm_output']['diificulty']
+        }
+
+    @staticmethod
+    def group(items,backend=None):
+        completed=[x for x in items if x['completed'] != NOT_COMPLETE]
+        if backend is None:
+            backend='numpy' if np is not None and len(completed)>=GROUPING_NUMPY_THRESHOLD else 'python'
+        if backend=='numpy':
+            return TaskGrouper.group_numpy(completed)
+        return TaskGrouper.group_python(completed)
+
+    @staticmethod
+    def group_python(completed):
+        ordinals=TaskGrouper.ordinals(completed)
+        # Stable sort on integer ordinals keeps each day's tasks in input order
+        order=sorted(range(len(completed)),key=ordinals.__getitem__)
+        grouped_by_date={}
+        for idx in order:
+            x=completed[idx]
+            grouped_by_date.setdefault(x['completed'], []).append(TaskGrouper.entry(x))
+        return grouped_by_date
+
+    @staticmethod
+    def group_numpy(completed):
+        if np is None:
+            raise RuntimeError("The numpy grouping backend needs numpy installed")
+        if not completed:
+            return {}
+        ordinals=np.fromiter(TaskGrouper.ordinals(completed),dtype=np.int32,count=len(completed))
+        order=np.argsort(ordinals,kind='stable')
+        # Run boundaries of equal ordinals in the sorted order are the day groups
+        sorted_ordinals=ordinals[order]
+        starts=np.flatnonzero(np.diff(sorted_ordinals,prepend=sorted_ordinals[0]-1))
+        ends=np.append(starts[1:],len(order))
+        grouped_by_date={}
+        for start,end in zip(starts.tolist(),ends.tolist()):
+            day=[completed[idx] for idx in order[start:end].tolist()]
+            grouped_by_date[day[0]['completed']]=[TaskGrouper.entry(x) for x in day]
+        return grouped_by_date
+
+    @staticmethod
+    def group_list(list_name,items,backend=None):
+        return {list_name: TaskGrouper.group(items,backend)}
@@ -0,0 +1,43 @@
+import json
+import hashlib
+
+
+class ShardLayout:
+    # Splits the 'Tracker' section into one Firestore document per list and month
+    @staticmethod
+    def fingerprint(obj):
+        raw=json.dumps(obj,sort_keys=True,separators=(',',':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def month(date_key):
+        # '%d-%m-%Y' -> 'YYYY-MM'
+        return f'{date_key[6:]}-{date_key[3:5]}'
+
+    @staticmethod
+    def shard_id(list_name,month):
+        # List names may contain '/', which Firestore document ids cannot
+        return f"{hashlib.sha1(list_name.encode('utf-8')).hexdigest()[:12]}_{month}"
+
+    @staticmethod
+    def split(tracker):
+        shards={}
+        for list_name,dates in tracker.items():
+            for date_key,tasks in dates.items():
+                month=ShardLayout.month(date_key)
+                shard=shards.setdefault(ShardLayout.shard_id(list_name,month),{'list':list_name,'month':month,'days':{}})
+                shard['days'][date_key]=tasks
+        return shards
+
+    @staticmethod
+    def join(shards,tracker=None):
+        # Entries already in `tracker` (e.g. written by the app into the legacy
+        # field) are kept and shard entries are merged in by title
+        tracker={list_name:{date_key:list(tasks) for date_key,tasks in dates.items()} for list_name,dates in (tracker or {}).items()}
+        for shard in shards.values():
+            dates=tracker.setdefault(shard['list'],{})
+            for date_key,tasks in shard.get('days',{}).items():
+                day=dates.setdefault(date_key,[])
+                titles={task['title'] for task in day}
+                day.extend(task for task in tasks if task['title'] not in titles)
+        return tracker
@@ -0,0 +1,96 @@
+from storage.grouping import TaskGrouper
+
+import bisect
+from datetime import date
+
+DATE_FORMAT='%d-%m-%Y'
+
+
+class TrackerStore:
+    # In-memory index of the 'Tracker' section: list -> day ordinal -> title -> entry.
+    # Dicts keep insertion order, so entries serialize back in the order they were added.
+    def __init__(self):
+        self.lists={}
+        self.ordinals={}
+        self.labels={}
+        # (list, ordinal) pairs changed since load, for incremental rollups
+        self.touched=set()
+        # Row-level changes for append-only storage; None unless a loader asks for it
+        self.journal=None
+
+    @classmethod
+    def from_dict(cls,tracker):
+        store=cls()
+        for list_name,dates in tracker.items():
+            store.ensure_list(list_name)
+            for date_key,tasks in dates.items():
+                for task in tasks:
+                    store.add(list_name,date_key,task)
+        store.touched=set()
+        return store
+
+    def to_dict(self):
+        return {
+            list_name:{self.label(ordinal):list(days[ordinal].values()) for ordinal in self.ordinals[list_name]}
+            for list_name,days in self.lists.items()
+        }
+
+    def ordinal(self,date_key):
+        if isinstance(date_key,int):
+            return date_key
+        ordinal=TaskGrouper.date_ordinal(date_key)
+        self.labels.setdefault(ordinal,date_key)
+        return ordinal
+
+    def label(self,ordinal):
+        date_key=self.labels.get(ordinal)
+        if date_key is None:
+            date_key=self.labels[ordinal]=date.fromordinal(ordinal).strftime(DATE_FORMAT)
+        return date_key
+
+    def ensure_list(self,list_name):
+        self.lists.setdefault(list_name,{})
+        self.ordinals.setdefault(list_name,[])
+
+    def add(self,list_name,date_key,task):
+        ordinal=self.ordinal(date_key)
+        days=self.lists.setdefault(list_name,{})
+        day=days.get(ordinal)
+        if day is None:
+            day=days[ordinal]={}
+            bisect.insort(self.ordinals.setdefault(list_name,[]),ordinal)
+        if task['title'] in day:
+            return False
+        day[task['title']]=task
+        self.touched.add((list_name,ordinal))
+        if self.journal is not None:
+            self.journal.append((1,list_name,ordinal,task))
+        return True
+
+    def recent(self,list_name,days):
+        # Ordinals within `days` days of the list's most recent date
+        ordinals=self.ordinals.get(list_name,[])
+        if not ordinals:
+            return []
+        return ordinals[bisect.bisect_right(ordinals,ordinals[-1]-days):]
+
+    def remove_titles(self,list_name,date_key,titles):
+        # Returns True when the day ends up empty and is dropped
+        ordinal=self.ordinal(date_key)
+        days=self.lists.get(list_name,{})
+        day=days.get(ordinal)
+        if day is None:
+            return False
+        removed=titles & day.keys()
+        for title in removed:
+            del day[title]
+        if removed:
+            self.touched.add((list_name,ordinal))
+            if self.journal is not None:
+                self.journal.extend((0,list_name,ordinal,{'title':title}) for title in removed)
+        if day:
+            return False
+        del days[ordinal]
+        ordinals=self.ordinals[list_name]
+        del ordinals[bisect.bisect_left(ordinals,ordinal)]
+        return True
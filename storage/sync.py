@@ -0,0 +1,176 @@
+from config.constants import LIST_TRACKER,SYNC_STATE,AGGREGATES,TRACKER_COLUMNS
+from storage.shards import ShardLayout
+from storage.store import TrackerStore
+from storage.aggregates import HeatmapAggregates
+from storage.columnar import TrackerFile
+from instrumentation import TRACER
+
+import os
+import json
+from datetime import datetime, timezone
+
+VERSION_KEYS=('Version','UpdatedAt')
+
+
+class TrackerSync:
+    # The local tracker.json is the source of truth; this reconciles it with the
+    # remote copy as a separate step. Nothing is recorded until a push succeeds,
+    # so an interrupted sync simply runs again next time.
+    def __init__(self,remote_factory,path=LIST_TRACKER,state_path=SYNC_STATE,aggregates_path=AGGREGATES,columns_path=TRACKER_COLUMNS):
+        self.remote_factory=remote_factory
+        self._remote=None
+        self.path=path
+        self.file=TrackerFile(path,columns_path)
+        self.state_path=state_path
+        self.aggregates_path=aggregates_path
+        self.state=self.load_state()
+
+    @property
+    def remote(self):
+        if self._remote is None:
+            self._remote=self.remote_factory()
+        return self._remote
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path,'r') as f:
+                return json.load(f)
+        return {'version':0,'local_hash':None,'remote_hash':None}
+
+    def save_state(self):
+        tmp_path=self.state_path+'.tmp'
+        with open(tmp_path,'w') as f:
+            json.dump(self.state,f)
+        os.replace(tmp_path,self.state_path)
+
+    @staticmethod
+    def content_hash(data):
+        return ShardLayout.fingerprint({key:value for key,value in data.items() if key not in VERSION_KEYS})
+
+    def read_local(self):
+        return self.file.read()
+
+    def write_local(self,data,history=True):
+        self.file.write(data,history)
+
+    def bootstrap(self):
+        # A fresh checkout (e.g. a CI runner) has no local tracker to serve reads from
+        if self.read_local() is not None:
+            return False
+        remote=self.remote.get()
+        if remote is None:
+            return False
+        self.write_local(remote)
+        self.record(remote)
+        self.publish_aggregates(remote,rebuild=True)
+        return True
+
+    def sync(self):
+        with TRACER.span('sync'):
+            return self._sync()
+
+    def _sync(self):
+        local=self.read_local()
+        remote=self.remote.get()
+        local_changed=local is not None and self.content_hash(local)!=self.state['local_hash']
+        remote_changed=remote is not None and self.content_hash(remote)!=self.state['remote_hash']
+        result={'pulled':False,'pushed':False,'conflict':False}
+
+        if remote_changed and not local_changed:
+            merged=remote
+            result['pulled']=True
+        elif remote_changed and local_changed:
+            # Both sides moved since the last sync: merged day by day against the last sync
+            merged=self.merge(local,remote,self.state.get('days'))
+            result['conflict']=True
+        elif local_changed:
+            merged=local
+        else:
+            result['version']=self.state['version']
+            result['aggregates']=self.publish_aggregates(local)
+            return result
+
+        if local_changed:
+            merged['Version']=max(self.state['version'],(remote or {}).get('Version',0))+1
+            merged['UpdatedAt']=datetime.now(timezone.utc).isoformat()
+            self.remote.push(merged)
+            result['pushed']=True
+        # A plain push only adds Version/UpdatedAt to what is already on disk
+        self.write_local(merged,history=result['pulled'] or result['conflict'])
+        self.record(merged)
+        result['version']=self.state['version']
+        # Pulled or merged entries were never aggregated locally
+        result['aggregates']=self.publish_aggregates(merged,rebuild=result['pulled'] or result['conflict'])
+        return result
+
+    def record(self,data):
+        content_hash=self.content_hash(data)
+        self.state={
+            'version':data.get('Version',0),'local_hash':content_hash,'remote_hash':content_hash,
+            'aggregates_hash':self.state.get('aggregates_hash'),'days':self.day_hashes(data),
+        }
+        self.save_state()
+
+    def publish_aggregates(self,data,rebuild=False):
+        aggregates=HeatmapAggregates.load(self.aggregates_path)
+        if rebuild or aggregates.empty:
+            if data is None:
+                return False
+            aggregates.rebuild(TrackerStore.from_dict(data.get('Tracker',{})))
+            aggregates.save()
+        fingerprint=aggregates.fingerprint()
+        if fingerprint==self.state.get('aggregates_hash'):
+            return False
+        self.remote.push_aggregates(aggregates.to_dict())
+        self.state['aggregates_hash']=fingerprint
+        self.save_state()
+        return True
+
+    @staticmethod
+    def day_hash(tasks):
+        if tasks is None:
+            return None
+        return ShardLayout.fingerprint(sorted(tasks,key=lambda task: task['title']))[:16]
+
+    @staticmethod
+    def day_hashes(data):
+        # One short hash per list and day of what both sides held after this sync
+        return {
+            list_name:{date_key:TrackerSync.day_hash(tasks) for date_key,tasks in dates.items()}
+            for list_name,dates in data.get('Tracker',{}).items()
+        }
+
+    @staticmethod
+    def merge(local,remote,base=None):
+        # Three-way per list and day against the hashes of the last sync. A side
+        # whose day still matches them did not touch it, so the other side's copy
+        # wins, deletions included (entries pruned when a task was reopened). Days
+        # both sides changed, and every day when there is no base, keep the
+        # entries from either side.
+        merged={**remote,**local}
+        merged['lists']=list(dict.fromkeys(local.get('lists',[])+remote.get('lists',[])))
+        local_tracker=local.get('Tracker',{})
+        remote_tracker=remote.get('Tracker',{})
+        store=TrackerStore()
+        for list_name in dict.fromkeys(list(local_tracker)+list(remote_tracker)):
+            store.ensure_list(list_name)
+            local_days=local_tracker.get(list_name,{})
+            remote_days=remote_tracker.get(list_name,{})
+            base_days=(base or {}).get(list_name,{})
+            for date_key in dict.fromkeys(list(local_days)+list(remote_days)):
+                sides=[local_days.get(date_key),remote_days.get(date_key)]
+                if base is not None:
+                    if TrackerSync.day_hash(sides[1])==base_days.get(date_key):
+                        sides=sides[:1]
+                    elif TrackerSync.day_hash(sides[0])==base_days.get(date_key):
+                        sides=sides[1:]
+                for tasks in sides:
+                    for task in tasks or []:
+                        store.add(list_name,date_key,task)
+        merged['Tracker']=store.to_dict()
+        # Each side fetched Google Tasks up to its own watermark and both are merged in
+        sync_state=dict(remote.get('Sync',{}))
+        for list_name,watermark in local.get('Sync',{}).items():
+            sync_state[list_name]=max(watermark,sync_state.get(list_name,''))
+        merged['Sync']=sync_state
+        return merged
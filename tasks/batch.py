@@ -0,0 +1,109 @@
+from config.constants import BATCH_CONCURRENCY,FETCH_CONCURRENCY,LLM_CONCURRENCY
+from config.profile import Profile
+from tasks.getTasks import TrackerProvider
+from llm.cache import ClassificationCache
+from instrumentation import TRACER
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchRunner:
+    # One process for many users: the LLM scheduler, its pooled HTTP client,
+    # the LLM worker threads and the classification cache are shared, while
+    # credentials, trackers, fingerprints and sync state stay per profile
+    def __init__(self,profiles,provider,model,remote_factory=None,cache=None,concurrency=BATCH_CONCURRENCY,
+                 fetch_concurrency=FETCH_CONCURRENCY,llm_concurrency=LLM_CONCURRENCY,full_resync=False,offline=False):
+        self.profiles=profiles
+        self.provider=provider
+        self.model=model
+        self.remote_factory=remote_factory
+        self.cache=cache or ClassificationCache()
+        self.concurrency=max(1,int(concurrency))
+        self.fetch_concurrency=fetch_concurrency
+        self.llm_concurrency=max(1,int(llm_concurrency))
+        self.full_resync=full_resync
+        self.offline=offline or remote_factory is None
+
+    @staticmethod
+    def load_manifest(path):
+        # {"concurrency": 4, "users": [{"name": "alice", "root": "profiles/alice", ...}]}
+        with open(path,'r') as f:
+            manifest=json.load(f)
+        base_dir=os.path.dirname(os.path.abspath(path))
+        profiles=[Profile.from_manifest(entry,base_dir) for entry in manifest.get('users',[])]
+        names=[profile.name for profile in profiles]
+        if len(set(names))!=len(names):
+            raise ValueError('User names in the batch manifest must be unique')
+        return profiles,manifest.get('concurrency',BATCH_CONCURRENCY)
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.llm_concurrency) as llm_executor, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as user_executor:
+            reports=list(user_executor.map(lambda profile: self.run_user(profile,llm_executor),self.profiles))
+        self.cache.save()
+        return reports
+
+    def run_user(self,profile,llm_executor):
+        report={'user':profile.name,'status':'ok','error':None,'tasks':0,'fetch':0.0,'save':0.0,'sync':0.0,'total':0.0,'sync_result':None}
+        started=time.perf_counter()
+        try:
+            with TRACER.span('batch.user',user=profile.name):
+                self.process(profile,llm_executor,report)
+        except Exception as exc:
+            # One user's expired token or broken tracker never stops the others
+            report['status']='failed'
+            report['error']=f'{type(exc).__name__}: {exc}'
+        report['total']=time.perf_counter()-started
+        return report
+
+    def process(self,profile,llm_executor,report):
+        from utils import SaveUtils
+
+        if not os.path.exists(profile.token):
+            raise FileNotFoundError(f'No OAuth token at {profile.token}; authorize with --batch MANIFEST --authorize {profile.name}')
+        tasks_obj=TrackerProvider(profile,cache=self.cache)
+        # Nobody is there to finish a sign-in, so a token that cannot be refreshed fails the user
+        if tasks_obj.services.load(interactive=False) is None:
+            raise PermissionError(f'The OAuth token at {profile.token} has expired and cannot be refreshed; authorize with --batch MANIFEST --authorize {profile.name}')
+        tasks_obj.services.warm()
+        bootstrap=self.syncer(profile,lambda: self.remote_factory(profile))
+        if not self.offline:
+            bootstrap.bootstrap()
+        if not os.path.exists(profile.tracker):
+            raise FileNotFoundError(f'No tracker at {profile.tracker}')
+
+        start=time.perf_counter()
+        response=tasks_obj.list_google_tasks(
+            tasks_obj.read_local_list(),self.provider,self.model,full_resync=self.full_resync,
+            fetch_concurrency=self.fetch_concurrency,llm_executor=llm_executor
+        ) or {}
+        report['tasks']=sum(len(tasks) for tasks in response.values())
+        report['fetch']=time.perf_counter()-start
+
+        start=time.perf_counter()
+        SaveUtils(profile).save(response,watermarks=tasks_obj.watermarks)
+        tasks_obj.fingerprints.save()
+        report['save']=time.perf_counter()-start
+
+        if not self.offline:
+            start=time.perf_counter()
+            # Built after the save so it reads the history this run wrote; the
+            # remote (and its named Firebase app) is the one bootstrap opened
+            syncer=self.syncer(profile,lambda: bootstrap.remote)
+            report['sync_result']=syncer.sync()
+            report['sync']=time.perf_counter()-start
+
+    @staticmethod
+    def syncer(profile,remote_factory):
+        from storage.sync import TrackerSync
+
+        return TrackerSync(remote_factory,profile.tracker,profile.sync_state,profile.aggregates,profile.columns)
+
+    @staticmethod
+    def authorize(profile):
+        # Runs the interactive OAuth flow once so nightly runs can refresh the token unattended
+        os.makedirs(profile.root,exist_ok=True)
+        return TrackerProvider(profile).creds is not None
@@ -1,47 +1,57 @@
-from config.constants import LIST_TRACKER,SCOPES,GOOGLE_CRED,LOCAL_CRED
+from config.constants import DEFAULT_CATEGORIES,LLM_CONCURRENCY,FETCH_CONCURRENCY,TASKLISTS_PAGE_SIZE,TASKS_PAGE_SIZE
+from config.profile import Profile
+from llm.cache import ClassificationCache
+from storage.fingerprints import TaskFingerprints
+from tasks.services import ServiceManager
 from views.tasks_view import TaskView
-from views.setup_view import SetupView
+from instrumentation import TRACER
 
-import pickle
 import os
 import json
+import threading
+from itertools import chain
+from collections import deque
 from datetime import datetime
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from contextlib import nullcontext
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 class TrackerProvider:
-    def __init__(self):
-        creds = None
-        if os.path.exists(LOCAL_CRED):
-            with open(LOCAL_CRED, 'rb') as token:
-                creds = pickle.load(token)
-
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    GOOGLE_CRED, SCOPES)
-                creds = flow.run_local_server(
-                    port=0,
-                    authorization_prompt_params={'access_type': 'offline', 'prompt': 'consent'}
-                )
-            with open(LOCAL_CRED, 'wb') as token:
-                pickle.dump(creds, token)
+    # Credentials and the classification cache load on first use, so reading
+    # the tracked lists never pays for OAuth or the Google client libraries
+    def __init__(self,profile=None,cache=None):
+        # A shared cache lets the batch runner classify a title once for every user
+        self.profile=profile or Profile()
+        self.services=ServiceManager(self.profile)
+        self._cache=cache
+        self.lock=threading.Lock()
+        self.watermarks={}
+        self.fingerprints=TaskFingerprints(path=self.profile.fingerprints)
+
+    @property
+    def creds(self):
+        return self.services.credentials
 
-        self.creds=creds
+    @property
+    def cache(self):
+        if self._cache is None:
+            with self.lock:
+                if self._cache is None:
+                    self._cache=ClassificationCache()
+        return self._cache
+
+    def refresh_credentials(self,margin):
+        # Refreshes ahead of expiry so a poll never stalls on an expired token
+        return self.services.refresh(margin)
 
     def read_local_list(self):
-        if not os.path.exists(LIST_TRACKER):
+        if not os.path.exists(self.profile.tracker):
+            from views.setup_view import SetupView
             name=SetupView.ask_first_list()
-            with open(LIST_TRACKER, 'w') as f:
+            with open(self.profile.tracker, 'w') as f:
                 json.dump({"lists": [name]}, f)
         
-        with open(LIST_TRACKER, 'r+') as f: 
+        with open(self.profile.tracker, 'r+') as f: 
             if os.fstat(f.fileno()).st_size == 0:
                 f.write(json.dumps({"lists": []}))
                 f.seek(0)
@@ -53,68 +63,210 @@ class TrackerProvider:
         current_lists = self.read_local_list()
         if list_name not in current_lists:
             current_lists.add(list_name)
-            with open(LIST_TRACKER,'w') as f:
-                json.dump({'lists': list(current_lists)}, f, indent=2)
+            with open(self.profile.tracker,'r') as f:
+                data = json.load(f)
+            # Keep the tracker history and sync state alongside the list names
+            data['lists'] = list(current_lists)
+            with open(self.profile.tracker,'w') as f:
+                json.dump(data, f, indent=2)
             return True
         else :
             TaskView.list_already_tracked_view()
             return False
 
-    def authenticate_google_tasks(self):
-        creds = None
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
-                creds = pickle.load(token)
+    def read_sync_state(self):
+        if not os.path.exists(self.profile.tracker):
+            return {}
+        with open(self.profile.tracker, 'r') as f:
+            try:
+                data = json.load(f)
+            except ValueError:
+                return {}
+        return data.get('Sync', {})
 
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', SCOPES)
-                creds = flow.run_local_server(port=0,access_type='offline')
+    def tracker_file(self):
+        # storage.columnar pulls in numpy when installed, so it loads only once a run needs it
+        from storage.columnar import TrackerFile
+        return TrackerFile(self.profile.tracker,self.profile.columns)
 
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(creds, token)
+    def load_fingerprints(self,full_resync=False):
+        # --full-resync pushes every task through again and its hashes replace the old ones
+        if full_resync or not os.path.exists(self.profile.tracker):
+            self.fingerprints=TaskFingerprints(path=self.profile.fingerprints,tracker=self.tracker_file())
+            return self.fingerprints
+        self.fingerprints=TaskFingerprints.load(self.tracker_file(),self.profile.fingerprints)
+        return self.fingerprints
 
-        return creds
+    def get_service(self):
+        # One service per process; requests run on a session from session()
+        return self.services.service
 
-    def list_google_tasks(self,tracked_titles,provider,model):
-        service = build('tasks', 'v1', credentials=self.creds)
-        tasklists = service.tasklists().list(maxResults=10).execute()
-        items = tasklists.get('items', [])
-        flag=True
+    def session(self):
+        return self.services.session()
 
-        tasks_info={}
+    @staticmethod
+    def paginate(method,http=None,**query):
+        while True:
+            with TRACER.span('tasks.page'):
+                response=method(**query).execute(http=http)
+            TRACER.count('tasks.pages')
+            TRACER.count_bytes('tasks.bytes_read',response)
+            yield response.get('items', [])
+            query['pageToken']=response.get('nextPageToken')
+            if not query['pageToken']:
+                break
+
+    def tracked_tasklists(self,tracked_titles):
+        service = self.get_service()
+        with self.session() as http:
+            items = [tasklist for page in self.paginate(service.tasklists().list,http,maxResults=TASKLISTS_PAGE_SIZE) for tasklist in page]
 
         if not items:
             TaskView.no_tasks_view()
             return
         
-        for tasklist in items:
-            if tasklist['title'].strip() in tracked_titles:
-                flag=False
-                tasks = service.tasks().list(tasklist=tasklist['id'],showHidden=True).execute()
-                task_items = tasks.get('items', [])
-                tasks_info[tasklist['title'].strip()]=self.parallel_process_tasks(task_items,provider,model)
-
-        if flag: 
+        tracked=[tasklist for tasklist in items if tasklist['title'].strip() in tracked_titles]
+        if not tracked:
             TaskView.no_title_view()
+            return
+        return tracked
+
+    def list_google_tasks(self,tracked_titles,provider,model,full_resync=False,fetch_concurrency=FETCH_CONCURRENCY,llm_executor=None,fetch_executor=None):
+        tracked=self.tracked_tasklists(tracked_titles)
+        if not tracked:
+            return
+
+        tasks_info={}
+        # Per-list high-water marks of the last seen 'updated' timestamp
+        sync_state={} if full_resync else self.read_sync_state()
+        self.watermarks={}
+        self.load_fingerprints(full_resync)
+
+        # A caller-owned LLM executor (the batch runner's) bounds requests across every user,
+        # and a long-lived fetch executor (--watch) keeps its per-thread services warm
+        with (nullcontext(llm_executor) if llm_executor else ThreadPoolExecutor(max_workers=LLM_CONCURRENCY)) as llm_executor, \
+                (nullcontext(fetch_executor) if fetch_executor else ThreadPoolExecutor(max_workers=max(1,int(fetch_concurrency)))) as fetch_executor:
+            futures = {
+                fetch_executor.submit(self.fetch_list,tasklist,sync_state.get(tasklist['title'].strip()),provider,model,llm_executor): tasklist['title'].strip()
+                for tasklist in tracked
+            }
+            for future in as_completed(futures):
+                tasks_info[futures[future]]=future.result()
+        return tasks_info
+
+    def fetch_list(self,tasklist,updated_min,provider,model,executor):
+        # Every page is submitted before the first is collected, so classification
+        # of each page starts while the following pages download
+        with self.session() as http:
+            return [task for _,enriched in self.classified_pages(tasklist,updated_min,provider,model,executor,http,lookahead=None) for task in enriched]
+
+    def stream_google_tasks(self,tracked_titles,provider,model,full_resync=False):
+        # Yields (list name, enriched page) one page at a time, so the fetched history is
+        # never buffered; the tracker the pages are merged into still grows with it
+        tracked=self.tracked_tasklists(tracked_titles)
+        if not tracked:
+            return
+
+        sync_state={} if full_resync else self.read_sync_state()
+        self.watermarks={}
+        self.load_fingerprints(full_resync)
+        # Lists are fetched one after another, so one session serves them all
+        with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as executor, self.session() as http:
+            for tasklist in tracked:
+                yield from self.classified_pages(tasklist,sync_state.get(tasklist['title'].strip()),provider,model,executor,http)
+
+    def list_query(self,tasklist,updated_min):
+        # Tasks query for one list; without a watermark the whole list is read and
+        # the fingerprints may drop tasks that no longer come back
+        query={'tasklist':tasklist['id'],'showHidden':True,'maxResults':TASKS_PAGE_SIZE}
+        if updated_min:
+            query['updatedMin']=updated_min
         else:
-            return tasks_info
+            self.fingerprints.mark_full(tasklist['title'].strip())
+        return query
+
+    def classified_pages(self,tasklist,updated_min,provider,model,executor,http,lookahead=0):
+        # Yields (list name, enriched changed tasks) per page of one list, fetched from
+        # updated_min onwards. Up to `lookahead` pages (None: all) are submitted for
+        # classification ahead of the one being collected. The list's watermark is
+        # recorded once its last page is collected.
+        list_name=tasklist['title'].strip()
+        query=self.list_query(tasklist,updated_min)
+        submitted=deque()
+        watermark=None
+        complete=True
+        for page in chain(self.paginate(self.get_service().tasks().list,http,**query),[None]):
+            if page is not None:
+                watermark=max([task['updated'] for task in page if task.get('updated')]+([watermark] if watermark else []),default=None)
+                changed=self.fingerprints.changed(list_name,page)
+                if changed:
+                    titles=[task.get('title', 'No Title') for task in changed]
+                    submitted.append((changed,self.submit_titles(titles,provider,model,executor)))
+            while submitted and (page is None or (lookahead is not None and len(submitted)>lookahead)):
+                changed,(outputs,futures)=submitted.popleft()
+                outputs=self.collect_titles(outputs,futures,provider,model)
+                self.fingerprints.record(list_name,changed,outputs,self.provisional(provider))
+                enriched=self.enrich_page(changed,outputs)
+                complete=complete and len(enriched)==len(changed)
+                yield list_name,enriched
+        # Unclassified tasks must be fetched again, so the watermark stays put
+        if complete and watermark:
+            self.watermarks[list_name]=watermark
+
+    def submit_titles(self,titles,provider,model,executor):
+        categories=getattr(provider,'categories',DEFAULT_CATEGORIES)
+        batch_size=getattr(provider,'batch_size',1)
+        outputs={}
+        pending=[]
+        for title in dict.fromkeys(titles):
+            llm_output=self.cache.get(title,categories,model)
+            if llm_output is None:
+                pending.append(title)
+            else:
+                outputs[title]=llm_output
+        TRACER.count('cache.hits',len(outputs))
+        TRACER.count('cache.misses',len(pending))
 
-    def enrich_task(self,task, provider, model):
+        batches=[pending[i:i+batch_size] for i in range(0,len(pending),batch_size)]
+        futures = {executor.submit(provider.get_categories, batch, model): batch for batch in batches}
+        return outputs,futures
+
+    @staticmethod
+    def provisional(provider):
+        # The local tier's guesses are not LLM answers; None for every other provider
+        return getattr(provider,'answered_locally',None)
+
+    def collect_titles(self,outputs,futures,provider,model):
+        categories=getattr(provider,'categories',DEFAULT_CATEGORIES)
+        provisional=self.provisional(provider)
+        for future in as_completed(futures):
+            for title,llm_output in zip(futures[future],future.result()):
+                if not (provisional and provisional(title)):
+                    self.cache.put(title,categories,model,llm_output)
+                outputs[title]=llm_output
+        return outputs
+
+    def classify_titles(self,titles,provider,model):
+        with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as executor:
+            outputs,futures=self.submit_titles(titles,provider,model,executor)
+            return self.collect_titles(outputs,futures,provider,model)
+
+    def enrich_task(self,task, llm_output):
         return {
             'title': task.get('title', 'No Title'),
             'status': task.get('status', 'In-progess'),
             'completed': datetime.strptime(task.get('completed', ''), "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%d-%m-%Y") if task.get('completed') else 'Not complete',
-            'llm_output': provider.get_category(task.get('title', 'No Title'), model),
+            'llm_output': llm_output,
         }
 
+    def enrich_page(self,task_items,outputs):
+        # Tasks the provider could not classify are left for the next run
+        return [
+            self.enrich_task(task, outputs[task.get('title', 'No Title')])
+            for task in task_items
+            if outputs.get(task.get('title', 'No Title'))
+        ]
+
     def parallel_process_tasks(self,task_items, provider, model):
-        results = []
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self.enrich_task, task, provider, model) for task in task_items]
-            for future in as_completed(futures):
-                results.append(future.result())
-        return results
+        outputs=self.classify_titles([task.get('title', 'No Title') for task in task_items],provider,model)
+        return self.enrich_page(task_items,outputs)
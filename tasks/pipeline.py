@@ -0,0 +1,120 @@
+from config.constants import LLM_CONCURRENCY,FETCH_CONCURRENCY,PIPELINE_QUEUE_SIZE
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+DONE=object()
+
+
+class TaskPipeline:
+    # fetch -> classify -> merge, connected by bounded queues so a slow stage
+    # makes the upstream ones wait instead of buffering the whole history.
+    # The merge stage writes each page into save_utils' tracker as it arrives.
+    def __init__(self,tracker_provider,provider,model,save_utils,llm_concurrency=LLM_CONCURRENCY,fetch_concurrency=FETCH_CONCURRENCY,queue_size=PIPELINE_QUEUE_SIZE):
+        self.tracker_provider=tracker_provider
+        self.save_utils=save_utils
+        self.provider=provider
+        self.model=model
+        self.llm_concurrency=max(1,int(llm_concurrency))
+        self.fetch_concurrency=max(1,int(fetch_concurrency))
+        self.queue_size=queue_size
+        self.provisional=tracker_provider.provisional(provider)
+
+    def run(self,tracked_titles,full_resync=False):
+        # Returns pages, tasks and completed tasks merged per list
+        return asyncio.run(self.run_async(tracked_titles,full_resync))
+
+    async def run_async(self,tracked_titles,full_resync=False):
+        loop=asyncio.get_running_loop()
+        # Page fetches and the merge run on the default executor; LLM requests get their
+        # own, whose size bounds the requests in flight across every list
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.fetch_concurrency+1))
+
+        # Loads the token and lists the tasklists off the event loop
+        tracked=await asyncio.to_thread(self.tracker_provider.tracked_tasklists,tracked_titles)
+        if not tracked:
+            return {}
+
+        sync_state={} if full_resync else self.tracker_provider.read_sync_state()
+        self.tracker_provider.watermarks={}
+        self.fingerprints=await asyncio.to_thread(self.tracker_provider.load_fingerprints,full_resync)
+        self.llm_executor=ThreadPoolExecutor(max_workers=self.llm_concurrency)
+        fetch_semaphore=asyncio.Semaphore(self.fetch_concurrency)
+        page_queue=asyncio.Queue(maxsize=self.queue_size)
+        merge_queue=asyncio.Queue(maxsize=self.queue_size)
+        summary={}
+
+        merger=asyncio.create_task(self.merge(merge_queue,summary))
+        classifiers=[asyncio.create_task(self.classify(page_queue,merge_queue)) for _ in range(self.llm_concurrency)]
+        try:
+            await asyncio.gather(*[
+                self.fetch(tasklist,sync_state.get(tasklist['title'].strip()),page_queue,fetch_semaphore)
+                for tasklist in tracked
+            ])
+            for _ in classifiers:
+                await page_queue.put(DONE)
+            await asyncio.gather(*classifiers)
+            await merge_queue.put(DONE)
+            await merger
+        finally:
+            for task in classifiers+[merger]:
+                task.cancel()
+            self.llm_executor.shutdown(wait=False,cancel_futures=True)
+        return summary
+
+    async def fetch(self,tasklist,updated_min,page_queue,fetch_semaphore):
+        list_name=tasklist['title'].strip()
+        query=self.tracker_provider.list_query(tasklist,updated_min)
+        async with fetch_semaphore:
+            # Pages of a list are fetched one at a time, so they can share one session
+            with self.tracker_provider.session() as http:
+                pages=self.tracker_provider.paginate(self.tracker_provider.get_service().tasks().list,http,**query)
+                while True:
+                    page=await asyncio.to_thread(next,pages,None)
+                    if page is None:
+                        break
+                    await page_queue.put((list_name,page,self.fingerprints.changed(list_name,page)))
+
+    async def classify(self,page_queue,merge_queue):
+        while True:
+            item=await page_queue.get()
+            if item is DONE:
+                return
+            list_name,page,changed=item
+            titles=[task.get('title', 'No Title') for task in changed]
+            outputs,futures=self.tracker_provider.submit_titles(titles,self.provider,self.model,self.llm_executor)
+            # Awaited here so collecting only reads finished futures and never blocks the loop
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+            outputs=self.tracker_provider.collect_titles(outputs,futures,self.provider,self.model)
+            await merge_queue.put((list_name,page,changed,outputs))
+
+    async def merge(self,merge_queue,summary):
+        # Same steps as --stream: one refresh, merge_page per page, one finish.
+        # Besides the tracker, only the pages queued between stages are held.
+        watermarks=self.tracker_provider.watermarks
+        incomplete=set()
+        await asyncio.to_thread(self.save_utils.refresh)
+        while True:
+            item=await merge_queue.get()
+            if item is DONE:
+                # The watermarks are final once every page is merged
+                await asyncio.to_thread(self.save_utils.finish,watermarks)
+                return
+            list_name,page,changed,outputs=item
+            self.fingerprints.record(list_name,changed,outputs,self.provisional)
+            enriched=self.tracker_provider.enrich_page(changed,outputs)
+            if changed:
+                await asyncio.to_thread(self.save_utils.merge_page,list_name,enriched)
+                counts=summary.setdefault(list_name,{'tasks':0,'completed':0,'pages':0})
+                counts['pages']+=1
+                counts['tasks']+=len(enriched)
+                counts['completed']+=sum(1 for task in enriched if task['completed']!='Not complete')
+            if len(enriched)<len(changed):
+                # Unclassified tasks must be fetched again, so the watermark stays put
+                incomplete.add(list_name)
+                watermarks.pop(list_name,None)
+            if list_name in incomplete:
+                continue
+            updated=max((task['updated'] for task in page if task.get('updated')),default=None)
+            if updated and updated>watermarks.get(list_name,''):
+                watermarks[list_name]=updated
@@ -0,0 +1,199 @@
+from config.constants import SCOPES,TOKEN_REFRESH_MARGIN,TASKS_DISCOVERY,TASKS_DISCOVERY_URL,TASKS_HTTP_TIMEOUT
+from instrumentation import TRACER
+
+import os
+import json
+import pickle
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_discovery=None
+_discovery_lock=threading.Lock()
+
+
+def discovery_document(path=TASKS_DISCOVERY):
+    # Parsed once per process and shared by every service built from it. The
+    # document ships with google-api-python-client; older clients fetch it once
+    # and keep the copy at TASKS_DISCOVERY.
+    global _discovery
+    if _discovery is None:
+        with _discovery_lock:
+            if _discovery is None:
+                from googleapiclient import discovery_cache
+                document=discovery_cache.get_static_doc('tasks','v1')
+                if document is None and os.path.exists(path):
+                    with open(path,'r') as f:
+                        document=f.read()
+                if document is None:
+                    import httplib2
+                    _,content=httplib2.Http(timeout=TASKS_HTTP_TIMEOUT).request(TASKS_DISCOVERY_URL)
+                    document=content.decode('utf-8')
+                    with open(path,'w') as f:
+                        f.write(document)
+                _discovery=json.loads(document)
+    return _discovery
+
+
+class ServiceManager:
+    # One profile's Google credentials and Tasks service for the life of the
+    # process. The service is built once; googleapiclient objects are only
+    # unsafe to share through their Http, so every request executes on an
+    # AuthorizedHttp session checked out of a pool, one per concurrent worker.
+    # Once loaded, the token is refreshed in the background ahead of expiry.
+    def __init__(self,profile,refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.profile=profile
+        self.refresh_margin=refresh_margin
+        self._creds=None
+        self._service=None
+        self.lock=threading.Lock()
+        self.refresh_lock=threading.Lock()
+        self.sessions=[]
+        self.sessions_lock=threading.Lock()
+        self.refresher=None
+        self.stopped=threading.Event()
+
+    @property
+    def credentials(self):
+        if self._creds is None:
+            self.load()
+        return self._creds
+
+    def load(self,interactive=True):
+        # None when the token needs the sign-in flow and interactive is False
+        with self.lock:
+            if self._creds is None:
+                with TRACER.span('oauth'):
+                    creds=self.load_credentials(interactive)
+                if creds is not None:
+                    self._creds=creds
+                    self.start_refresher()
+            return self._creds
+
+    def load_credentials(self,interactive=True):
+        from google.auth.transport.requests import Request
+
+        creds = None
+        if os.path.exists(self.profile.token):
+            with open(self.profile.token, 'rb') as token:
+                creds = pickle.load(token)
+
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            elif not interactive:
+                return None
+            else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.profile.google_credentials, SCOPES)
+                creds = flow.run_local_server(
+                    port=0,
+                    authorization_prompt_params={'access_type': 'offline', 'prompt': 'consent'}
+                )
+            self.save_credentials(creds)
+
+        return creds
+
+    def save_credentials(self,creds):
+        tmp_path=self.profile.token+'.tmp'
+        with open(tmp_path, 'wb') as token:
+            pickle.dump(creds, token)
+        os.replace(tmp_path,self.profile.token)
+
+    def seconds_left(self,creds):
+        expiry=getattr(creds,'expiry',None)
+        if expiry is None:
+            return None
+        # google-auth keeps expiry as a naive UTC datetime
+        return (expiry-datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+
+    def refresh(self,margin=None):
+        # Refreshes when the token is within `margin` seconds of expiry; True if it did
+        from google.auth.transport.requests import Request
+
+        creds=self.credentials
+        margin=self.refresh_margin if margin is None else margin
+        if not getattr(creds,'refresh_token',None):
+            return False
+        with self.refresh_lock:
+            left=self.seconds_left(creds)
+            if left is None or left>margin:
+                return False
+            with TRACER.span('oauth.refresh'):
+                creds.refresh(Request())
+            self.save_credentials(creds)
+        return True
+
+    def start_refresher(self):
+        if self.refresher is not None or not getattr(self._creds,'refresh_token',None):
+            return
+        self.refresher=threading.Thread(target=self.keep_fresh,name=f'token-refresh-{self.profile.name}',daemon=True)
+        self.refresher.start()
+
+    def keep_fresh(self):
+        while not self.stopped.is_set():
+            left=self.seconds_left(self._creds)
+            if left is None:
+                return
+            # Sleeps until the margin is reached, then refreshes off the request path
+            if self.stopped.wait(max(0.0,left-self.refresh_margin)):
+                return
+            try:
+                self.refresh()
+            except Exception:
+                # The request-time refresh in google-auth still covers this run
+                TRACER.count('oauth.refresh_errors')
+                if self.stopped.wait(60):
+                    return
+
+    def stop(self):
+        self.stopped.set()
+
+    @property
+    def service(self):
+        if self._service is None:
+            creds=self.credentials
+            with self.lock:
+                if self._service is None:
+                    from googleapiclient.discovery import build_from_document
+                    with TRACER.span('tasks.build_service'):
+                        self._service=build_from_document(discovery_document(),credentials=creds)
+        return self._service
+
+    def create_session(self):
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+
+        return AuthorizedHttp(self.credentials,http=httplib2.Http(timeout=TASKS_HTTP_TIMEOUT))
+
+    @contextmanager
+    def session(self):
+        # Idle sessions keep their connections, so later pages and runs skip the handshake
+        with self.sessions_lock:
+            http=self.sessions.pop() if self.sessions else None
+        if http is None:
+            http=self.create_session()
+        try:
+            yield http
+        finally:
+            with self.sessions_lock:
+                self.sessions.append(http)
+
+    def warm(self):
+        # Loads the token and builds the service in the background while the caller
+        # does other start-up work. Only a valid or refreshable token is loaded here;
+        # the sign-in flow is left to the foreground `credentials` path.
+        if self._service is not None or not os.path.exists(self.profile.token):
+            return None
+        thread=threading.Thread(target=self.warm_up,name=f'tasks-warm-{self.profile.name}',daemon=True)
+        thread.start()
+        return thread
+
+    def warm_up(self):
+        try:
+            if self.load(interactive=False) is not None:
+                self.service
+        except Exception:
+            # The first real request loads them again and reports the error
+            TRACER.count('tasks.warm_errors')
@@ -0,0 +1,149 @@
+from config.constants import (WATCH_INTERVAL,WATCH_JITTER,TOKEN_REFRESH_MARGIN,HEALTH_PORT,FETCH_CONCURRENCY,LLM_CONCURRENCY)
+from instrumentation import TRACER
+
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class WatchDaemon:
+    # Polls for changed tasks on an interval, keeping credentials, the Tasks
+    # service and its sessions, the LLM client and the Firebase client warm between polls.
+    # Each poll is an incremental run: watermarks and fingerprints limit it to deltas.
+    def __init__(self,tasks_obj,provider,model,syncer=None,save_factory=None,interval=WATCH_INTERVAL,jitter=WATCH_JITTER,
+                 fetch_concurrency=FETCH_CONCURRENCY,llm_concurrency=LLM_CONCURRENCY,refresh_margin=TOKEN_REFRESH_MARGIN,stats_sources=None):
+        self.tasks_obj=tasks_obj
+        self.provider=provider
+        self.model=model
+        self.syncer=syncer
+        self.save_factory=save_factory
+        self.interval=float(interval)
+        self.jitter=float(jitter)
+        self.fetch_concurrency=max(1,int(fetch_concurrency))
+        self.llm_concurrency=max(1,int(llm_concurrency))
+        self.refresh_margin=refresh_margin
+        # name -> callable returning a flat dict of numbers, exported on /metrics
+        self.stats_sources=stats_sources or {}
+        self.stopped=threading.Event()
+        self.lock=threading.Lock()
+        self.metrics={
+            'cycles':0,'failures':0,'tasks':0,'token_refreshes':0,
+            'last_cycle_seconds':0.0,'last_success':None,'last_error':None,'started':time.time(),
+        }
+
+    def next_delay(self):
+        return max(0.0,self.interval*(1+random.uniform(-self.jitter,self.jitter)))
+
+    def stop(self,*args):
+        self.stopped.set()
+
+    def run(self,cycles=None):
+        with ThreadPoolExecutor(max_workers=self.llm_concurrency) as llm_executor, \
+                ThreadPoolExecutor(max_workers=self.fetch_concurrency) as fetch_executor:
+            count=0
+            while not self.stopped.is_set():
+                self.cycle(llm_executor,fetch_executor)
+                count+=1
+                if cycles is not None and count>=cycles:
+                    break
+                self.stopped.wait(self.next_delay())
+
+    def cycle(self,llm_executor,fetch_executor):
+        started=time.perf_counter()
+        try:
+            with TRACER.span('watch.cycle'):
+                if self.tasks_obj.refresh_credentials(self.refresh_margin):
+                    self.count('token_refreshes')
+                response=self.tasks_obj.list_google_tasks(
+                    self.tasks_obj.read_local_list(),self.provider,self.model,
+                    llm_executor=llm_executor,fetch_executor=fetch_executor
+                ) or {}
+                save_utils=self.save_factory()
+                save_utils.save(response,watermarks=self.tasks_obj.watermarks)
+                self.tasks_obj.fingerprints.save()
+                self.tasks_obj.cache.save()
+                self.provider.flush()
+                if self.syncer is not None:
+                    self.syncer.sync()
+        except Exception as exc:
+            # The next poll retries; nothing is recorded until a save and sync succeed
+            with self.lock:
+                self.metrics['failures']+=1
+                self.metrics['last_error']=f'{type(exc).__name__}: {exc}'
+        else:
+            with self.lock:
+                self.metrics['tasks']+=sum(len(tasks) for tasks in response.values())
+                self.metrics['last_success']=time.time()
+                self.metrics['last_error']=None
+        finally:
+            with self.lock:
+                self.metrics['cycles']+=1
+                self.metrics['last_cycle_seconds']=time.perf_counter()-started
+
+    def count(self,name):
+        with self.lock:
+            self.metrics[name]+=1
+
+    def health(self):
+        # Healthy while the last success is within a few intervals
+        with self.lock:
+            metrics=dict(self.metrics)
+        reference=metrics['last_success'] or metrics['started']
+        healthy=time.time()-reference<=3*self.interval+60
+        return healthy,{
+            'status':'ok' if healthy else 'stale',
+            'last_success':metrics['last_success'],
+            'last_error':metrics['last_error'],
+            'cycles':metrics['cycles'],
+            'failures':metrics['failures'],
+        }
+
+    def prometheus(self):
+        with self.lock:
+            metrics=dict(self.metrics)
+        lines=[
+            f"habit_watch_cycles_total {metrics['cycles']}",
+            f"habit_watch_failures_total {metrics['failures']}",
+            f"habit_watch_tasks_total {metrics['tasks']}",
+            f"habit_watch_token_refreshes_total {metrics['token_refreshes']}",
+            f"habit_watch_last_cycle_seconds {metrics['last_cycle_seconds']:.6f}",
+            f"habit_watch_last_success_timestamp {metrics['last_success'] or 0:.3f}",
+        ]
+        for source,stats in self.stats_sources.items():
+            for key,value in stats().items():
+                if isinstance(value,bool) or not isinstance(value,(int,float)):
+                    continue
+                lines.append(f'habit_{source}_{key} {value}')
+        return '\n'.join(lines)+'\n'
+
+    def serve(self,port=HEALTH_PORT,host='127.0.0.1'):
+        # /healthz for liveness probes and /metrics in the Prometheus text format
+        daemon=self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path=='/healthz':
+                    healthy,body=daemon.health()
+                    self.reply(200 if healthy else 503,'application/json',json.dumps(body))
+                elif self.path=='/metrics':
+                    self.reply(200,'text/plain; version=0.0.4',daemon.prometheus())
+                else:
+                    self.reply(404,'text/plain','not found\n')
+
+            def reply(self,status,content_type,body):
+                payload=body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type',content_type)
+                self.send_header('Content-Length',str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self,*args):
+                pass
+
+        server=ThreadingHTTPServer((host,port),HealthHandler)
+        threading.Thread(target=server.serve_forever,daemon=True).start()
+        return server
@@ -1,103 +1,93 @@
-from config.constants import LIST_TRACKER,FIREBASE_CRED
+from config.constants import FIREBASE_CRED,FIRESTORE_LAYOUT,FIRESTORE_BATCH_LIMIT
+from config.profile import Profile
+from storage.grouping import TaskGrouper
+from storage.shards import ShardLayout
+from storage.aggregates import HeatmapAggregates
+from storage.columnar import TrackerFile
+from instrumentation import TRACER
 
-import json
-from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from datetime import datetime, MAXYEAR,timedelta
-
-import firebase_admin
-from firebase_admin import credentials, firestore
 
 class SaveUtils: 
+    def __init__(self, profile=None):
+        self.profile = profile or Profile()
+
     def refresh(self):
-        self.data=json.load(open(LIST_TRACKER,'r'))
-        if 'Tracker' not in self.data.keys():
-            self.data['Tracker']={}
+        with TRACER.span('save.refresh'):
+            self._refresh()
+
+    def _refresh(self):
+        self.file=TrackerFile(self.profile.tracker,self.profile.columns)
+        self.data=self.file.read_meta()
+        if 'Sync' not in self.data.keys():
+            self.data['Sync']={}
+        self.store=self.file.load_store(self.data)
+        # The store is the only copy of the history until save_json writes it back
+        self.data.pop('Tracker',None)
+        self.not_complete_titles={}
+        self.changed=False
+        self.aggregates=HeatmapAggregates.load(self.profile.aggregates)
 
     @staticmethod
     def process_list_name(args):
         list_name, items = args
-        sorted_items = sorted(
-            items,
-            key=lambda x: (
-                datetime.strptime(x['completed'], '%d-%m-%Y')
-                if x['completed'] != 'Not complete'
-                else datetime(MAXYEAR, 12, 31)
-            )
-        )
-        grouped_by_date = {}
-        for x in sorted_items:
-            if x['completed'] != 'Not complete':
-                date = x['completed']
-                entry = {
-                    'title': x['title'],
-                    'category': x['llm_output']['category'],
-                    'difficulty': x['llm_output']['diificulty']
-                }
-                grouped_by_date.setdefault(date, []).append(entry)
-
-        formatted_entries = {date: items for date, items in grouped_by_date.items()}
-        return {list_name: formatted_entries}
-
-    def save(self, response,firebase_obj):
-        self.refresh()
-        tracker_entries = []
-
-        with ProcessPoolExecutor() as executor:
-            futures = [
-                executor.submit(SaveUtils.process_list_name, (list_name, response[list_name]))
-                for list_name in self.data['lists']
-            ]
-            for future in as_completed(futures):
-                tracker_entries.append(future.result())
-        
-        self.create_json(tracker_entries)
-        
+        return TaskGrouper.group_list(list_name, items)
 
+    def save(self, response,watermarks=None):
+        self.refresh()
         for list_name in self.data['lists']:
-            tracker = self.data['Tracker'][list_name]
-            
-            # Sort dates as datetime objects
-            dates = sorted(
-                tracker.keys(),
-                key=lambda x: datetime.strptime(x, '%d-%m-%Y')
-            )
-            
-            # Convert last date to datetime object
-            last_date = datetime.strptime(dates[-1], '%d-%m-%Y')
-            week_ago = last_date - timedelta(days=7)
-            
-            for date_key in dates:
-                current_date = datetime.strptime(date_key, '%d-%m-%Y')
-                
-                if current_date > week_ago:
-                    tasks = tracker[date_key]
-                    not_complete_titles = {
-                        x['title']
-                        for x in response.get(list_name, [])
-                        if x['completed'] == 'Not complete'
-                    }
-                    tracker[date_key] = [
-                        task for task in tasks if task['title'] not in not_complete_titles
-                    ]
-                    
-                    if not tracker[date_key]:
-                        print(f'Deleting entery {tracker[date_key]}')
-                        del tracker[date_key]
-        self.save_json(firebase_obj)
+            self.merge_page(list_name, response.get(list_name, []))
+        self.finish(watermarks)
+
+    def merge_page(self, list_name, items):
+        # Lists without changed tasks skip grouping, merging and pruning
+        if not items:
+            return
+        self.changed=True
+        # Grouping is a sort plus one pass per list, far cheaper than shipping it to worker processes
+        with TRACER.span('save.group', list=list_name, tasks=len(items)):
+            self.create_json([SaveUtils.process_list_name((list_name, items))])
+        self.not_complete_titles.setdefault(list_name, set()).update(
+            x['title'] for x in items if x['completed'] == 'Not complete'
+        )
 
+    def finish(self, watermarks=None):
+        self.prune()
+        # Only advance the sync watermarks once the deltas are merged
+        sync_state=dict(self.data['Sync'])
+        self.data['Sync'].update(watermarks or {})
+        if self.changed or self.data['Sync']!=sync_state:
+            self.aggregate()
+            self.save_json()
+
+    def aggregate(self):
+        with TRACER.span('save.aggregate', days=len({ordinal for _, ordinal in self.store.touched})):
+            if self.aggregates.empty:
+                self.aggregates.rebuild(self.store)
+            else:
+                self.aggregates.update(self.store, self.store.touched)
+            self.store.touched=set()
+
+    def prune(self):
+        with TRACER.span('save.prune'):
+            self._prune()
+
+    def _prune(self):
+        for list_name, not_complete_titles in self.not_complete_titles.items():
+            if not not_complete_titles:
+                continue
+            # Tasks re-opened within a week of the latest day are no longer done
+            for ordinal in self.store.recent(list_name, 7):
+                if self.store.remove_titles(list_name, ordinal, not_complete_titles):
+                    self.changed = True
+                    print(f'Deleting entery {self.store.label(ordinal)}')
 
     def create_json(self, tracker_entries):
-        tracker = self.data['Tracker']
         for entry in tracker_entries:
             for list_name, dates in entry.items():
-                list_data = tracker.setdefault(list_name, {})
+                self.store.ensure_list(list_name)
                 for date_key, tasks in dates.items():
-                    date_data = list_data.setdefault(date_key, [])
-                    titles_in_date=[x['title'] for x in date_data]
                     for task in tasks:
-                        if task['title'] not in titles_in_date:
-                            date_data.append(task)
+                        self.store.add(list_name, date_key, task)
 
 
 
@@ -121,25 +111,109 @@ class SaveUtils:
 
 
 
-    def save_json(self,firebase_obj):
-        json.dump(self.data,open(LIST_TRACKER,'w'))
-        firebase_obj.push(self.data)
+    def save_json(self):
+        # The local file is the only write; TrackerSync pushes it later
+        with TRACER.span('save.write', columnar=self.file.columnar):
+            TRACER.count('tracker.bytes_written',self.file.save(self.data,self.store))
+        self.aggregates.save()
 
 
 class Firebase():
-    def __init__(self):
-        cred = credentials.Certificate(FIREBASE_CRED)
-        firebase_admin.initialize_app(cred)
-        self.db = firestore.client()
+    def __init__(self,db=None,layout=FIRESTORE_LAYOUT,cred_path=FIREBASE_CRED,app_name=None):
+        if db is None:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            cred = credentials.Certificate(cred_path)
+            # Named apps let several users' projects live in one process
+            app = firebase_admin.initialize_app(cred, name=app_name) if app_name else firebase_admin.initialize_app(cred)
+            db = firestore.client(app=app)
+        self.db = db
+        self.layout = layout or FIRESTORE_LAYOUT
+        # What the remote side holds, as of the last get/push
+        self.remote_hash = None
+        self.remote_shards = None
+        self.heatmap_hash = None
+
+    @property
+    def doc_ref(self):
+        return self.db.collection("habit").document("tracker")
+
+    @property
+    def heatmap_ref(self):
+        return self.db.collection("habit").document("heatmap")
 
     def push(self,json):
-        doc_ref = self.db.collection("habit").document("tracker")
-        doc_ref.set(json)
+        with TRACER.span('firestore.push', layout=self.layout):
+            if self.layout == 'sharded':
+                return self.push_shards(json)
+            fingerprint = ShardLayout.fingerprint(json)
+            if fingerprint == self.remote_hash:
+                return
+            self.doc_ref.set(json)
+            self.remote_hash = fingerprint
+            TRACER.count('firestore.writes')
+            TRACER.count_bytes('firestore.bytes_written',json)
+
+    def push_aggregates(self,aggregates):
+        # One year of per-day counts plus all-time totals, instead of the full history
+        fingerprint = ShardLayout.fingerprint(aggregates)
+        if fingerprint == self.heatmap_hash:
+            return
+        with TRACER.span('firestore.push_aggregates'):
+            self.heatmap_ref.set(aggregates)
+        self.heatmap_hash = fingerprint
+        TRACER.count('firestore.writes')
+        TRACER.count_bytes('firestore.bytes_written',aggregates)
+
+    def push_shards(self,json):
+        if self.remote_shards is None:
+            self.get()
+        shards = ShardLayout.split(json.get('Tracker', {}))
+        hashes = {shard_id: ShardLayout.fingerprint(shard) for shard_id, shard in shards.items()}
+        shard_refs = self.doc_ref.collection("shards")
+
+        ops = [(shard_refs.document(shard_id), shards[shard_id]) for shard_id, fingerprint in hashes.items() if self.remote_shards.get(shard_id) != fingerprint]
+        ops += [(shard_refs.document(shard_id), None) for shard_id in self.remote_shards.keys() - hashes.keys()]
+        meta = {key: value for key, value in json.items() if key != 'Tracker'}
+        meta['Shards'] = hashes
+        meta_hash = ShardLayout.fingerprint(meta)
+        # The index document goes last so it never lists shards that were not written
+        if meta_hash != self.remote_hash:
+            ops.append((self.doc_ref, meta))
+
+        for start in range(0, len(ops), FIRESTORE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for ref, data in ops[start:start + FIRESTORE_BATCH_LIMIT]:
+                if data is None:
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, data)
+                    TRACER.count_bytes('firestore.bytes_written',data)
+            batch.commit()
+        TRACER.count('firestore.writes',len(ops))
+        self.remote_shards = hashes
+        self.remote_hash = meta_hash
     
     def get(self):
-        doc_ref = self.db.collection("habit").document("tracker")
+        with TRACER.span('firestore.get', layout=self.layout):
+            data = self._get()
+        TRACER.count_bytes('firestore.bytes_read',data)
+        return data
+
+    def _get(self):
+        doc_ref = self.doc_ref
         doc = doc_ref.get()
-        if doc.exists:
-            return doc.to_dict()
-        else:
-            return None
\ No newline at end of file
+        if not doc.exists:
+            self.remote_shards = {}
+            return None
+        data = doc.to_dict()
+        self.remote_hash = ShardLayout.fingerprint(data)
+        self.remote_shards = data.get('Shards', {})
+        if self.remote_shards or self.layout == 'sharded':
+            # Entries still in the single document (legacy data, app writes) are
+            # merged in and move to shards on the next push
+            shards = {snap.id: snap.to_dict() for snap in doc_ref.collection("shards").stream()}
+            data['Tracker'] = ShardLayout.join(shards, data.get('Tracker', {}))
+            data.pop('Shards', None)
+        return data
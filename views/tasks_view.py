@@ -56,4 +56,287 @@ class TaskView:
 
             table.add_row(title, status, due,llm['category'],llm['diificulty'])
 
-        rprint(table)
\ No newline at end of file
+        rprint(table)
+
+
+    @staticmethod
+    def display_storage_result(storage, converted):
+        if converted:
+            rprint(f"[bold green]💾  Tracker history stored as {storage}[/bold green]")
+        else:
+            rprint("[bold red]📭 No local tracker to convert.[/bold red]")
+
+
+    @staticmethod
+    def display_cache_stats(stats):
+        table = Table(title="🗄️  Classification Cache", show_lines=True)
+        table.add_column("Hits", style="green", justify="right")
+        table.add_column("Misses", style="yellow", justify="right")
+        table.add_column("Hit Rate", style="cyan", justify="right")
+        table.add_column("Evictions", style="red", justify="right")
+        table.add_column("Size", style="magenta", justify="right")
+
+        table.add_row(str(stats['hits']),str(stats['misses']),f"{stats['hit_rate']:.1%}",str(stats['evictions']),str(stats['size']))
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_fingerprint_stats(stats):
+        table = Table(title="🧬 Unchanged Tasks", show_lines=True)
+        table.add_column("Tasks Skipped", style="green", justify="right")
+        table.add_column("Unchanged Lists", style="cyan", justify="right")
+        table.add_column("Lists", style="magenta", justify="right")
+
+        table.add_row(str(stats['skipped']),str(stats['unchanged_lists']),str(stats['lists']))
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_scheduler_stats(stats):
+        table = Table(title="🚦 LLM Scheduler", show_lines=True)
+        table.add_column("Calls", style="green", justify="right")
+        table.add_column("Tasks", style="green", justify="right")
+        table.add_column("Tasks/min", style="cyan", justify="right")
+        table.add_column("Throttled", style="yellow", justify="right")
+        table.add_column("Retries", style="yellow", justify="right")
+        table.add_column("Failures", style="red", justify="right")
+        table.add_column("Held", style="red", justify="right")
+        table.add_column("Waited (s)", style="magenta", justify="right")
+        table.add_column("Circuit", style="magenta")
+
+        table.add_row(
+            str(stats['calls']),str(stats['tasks']),str(stats['throughput']),str(stats['throttled']),
+            str(stats['retries']),str(stats['failures']),str(stats['held']),str(stats['waited']),stats['circuit']
+        )
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_sync_result(outcome):
+        if outcome.get('offline'):
+            rprint("[bold yellow]📴  Offline[/bold yellow] [yellow]Changes are saved locally and will be pushed on the next sync.[/yellow]")
+        elif outcome.get('error'):
+            rprint(f"[bold red]⚠️  Sync failed:[/bold red] [yellow]{outcome['error']}. Changes stay pending for the next sync.[/yellow]")
+        elif outcome.get('conflict'):
+            rprint(f"[bold magenta]🔀  Merged remote and local changes[/bold magenta] [magenta](version {outcome['version']})[/magenta]")
+        elif outcome.get('pushed') or outcome.get('pulled'):
+            direction='Pushed' if outcome.get('pushed') else 'Pulled'
+            rprint(f"[bold green]☁️  {direction} tracker[/bold green] [green](version {outcome['version']})[/green]")
+        else:
+            rprint("[bold blue]☁️  Tracker already in sync[/bold blue]")
+
+
+    @staticmethod
+    def display_local_tier_stats(stats):
+        table = Table(title="🧠 Local Classifier", show_lines=True)
+        table.add_column("Answered Locally", style="green", justify="right")
+        table.add_column("Escalated", style="yellow", justify="right")
+        table.add_column("Escalation Rate", style="cyan", justify="right")
+        table.add_column("Agreement with LLM", style="magenta", justify="right")
+        table.add_column("Training Samples", style="blue", justify="right")
+
+        agreement = f"{stats['agreement']:.1%} of {stats['compared']}" if stats['agreement'] is not None else "n/a"
+        table.add_row(str(stats['local']),str(stats['escalated']),f"{stats['escalation_rate']:.1%}",agreement,str(stats['samples']))
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_stream_summary(summary):
+        if not summary:
+            rprint("[bold red]📭 No tasks found.[/bold red]")
+            return
+
+        table = Table(title="🌊 Streamed Task Lists", show_lines=True)
+        table.add_column("Task List Title", style="bold green")
+        table.add_column("Pages", style="cyan", justify="right")
+        table.add_column("Tasks", style="yellow", justify="right")
+        table.add_column("Completed", style="magenta", justify="right")
+
+        for list_name, counts in sorted(summary.items()):
+            table.add_row(list_name, str(counts['pages']), str(counts['tasks']), str(counts['completed']))
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_profile(summary, trace_path):
+        table = Table(title="⏱️  Profile", show_lines=True)
+        table.add_column("Stage", style="bold green")
+        table.add_column("Calls", style="cyan", justify="right")
+        table.add_column("Total (s)", style="yellow", justify="right")
+        table.add_column("Mean (ms)", style="magenta", justify="right")
+        table.add_column("Max (ms)", style="magenta", justify="right")
+        table.add_column("Errors", style="red", justify="right")
+
+        for stage in summary['stages']:
+            table.add_row(
+                stage['name'],str(stage['calls']),f"{stage['total']:.3f}",f"{stage['mean']*1000:.1f}",f"{stage['max']*1000:.1f}",str(stage['errors'])
+            )
+
+        rprint(table)
+
+        if summary['histograms']:
+            table = Table(title="📈 Latency", show_lines=True)
+            table.add_column("Metric", style="bold green")
+            table.add_column("Count", style="cyan", justify="right")
+            table.add_column("p50 (ms)", style="yellow", justify="right")
+            table.add_column("p95 (ms)", style="yellow", justify="right")
+            table.add_column("Max (ms)", style="magenta", justify="right")
+
+            for name, histogram in sorted(summary['histograms'].items()):
+                table.add_row(name,str(histogram['count']),f"{histogram['p50']*1000:.1f}",f"{histogram['p95']*1000:.1f}",f"{histogram['max']*1000:.1f}")
+
+            rprint(table)
+
+        if summary['counters']:
+            table = Table(title="🔢 Counters", show_lines=True)
+            table.add_column("Counter", style="bold green")
+            table.add_column("Value", style="cyan", justify="right")
+
+            for name, value in summary['counters'].items():
+                table.add_row(name,str(value))
+
+            rprint(table)
+
+        rprint(f"[blue]Trace written to {trace_path}[/blue]")
+
+
+    @staticmethod
+    def display_batch_report(reports):
+        if not reports:
+            rprint("[bold red]📭 No users in the batch manifest.[/bold red]")
+            return
+
+        table = Table(title="👥 Batch Run", show_lines=True)
+        table.add_column("User", style="bold green")
+        table.add_column("Status", style="magenta")
+        table.add_column("Tasks", style="cyan", justify="right")
+        table.add_column("Fetch + LLM (s)", style="yellow", justify="right")
+        table.add_column("Save (s)", style="yellow", justify="right")
+        table.add_column("Sync (s)", style="yellow", justify="right")
+        table.add_column("Total (s)", style="yellow", justify="right")
+        table.add_column("Error", style="red")
+
+        for report in reports:
+            status = "✅ ok" if report['status'] == 'ok' else "❌ failed"
+            table.add_row(
+                report['user'],status,str(report['tasks']),f"{report['fetch']:.2f}",f"{report['save']:.2f}",
+                f"{report['sync']:.2f}",f"{report['total']:.2f}",report['error'] or ""
+            )
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_watch_started(interval,port):
+        endpoint = f" [blue](health on http://127.0.0.1:{port}/healthz, metrics on /metrics)[/blue]" if port else ""
+        rprint(f"[bold green]👀 Watching for changes every {interval:g}s[/bold green]{endpoint} [dim]Ctrl+C to stop[/dim]")
+
+
+    @staticmethod
+    def display_watch_summary(metrics):
+        table = Table(title="👀 Watch Session", show_lines=True)
+        table.add_column("Polls", style="cyan", justify="right")
+        table.add_column("Failed", style="red", justify="right")
+        table.add_column("Tasks Processed", style="green", justify="right")
+        table.add_column("Token Refreshes", style="magenta", justify="right")
+        table.add_column("Last Error", style="yellow")
+
+        table.add_row(
+            str(metrics['cycles']),str(metrics['failures']),str(metrics['tasks']),
+            str(metrics['token_refreshes']),metrics['last_error'] or ""
+        )
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_deferred_batches(stats):
+        table = Table(title="📦 Deferred Batch Jobs", show_lines=True)
+        table.add_column("Submitted Now", style="green", justify="right")
+        table.add_column("Pending Jobs", style="yellow", justify="right")
+        table.add_column("Tasks Awaiting Answers", style="yellow", justify="right")
+        table.add_column("Collected", style="cyan", justify="right")
+        table.add_column("Used This Run", style="magenta", justify="right")
+
+        table.add_row(str(stats['submitted']),str(stats['jobs']),str(stats['pending']),str(stats['collected']),str(stats['served']))
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_token_usage(stats):
+        if not stats['calls']:
+            return
+
+        table = Table(title="🔢 LLM Tokens", show_lines=True)
+        table.add_column("Calls", style="cyan", justify="right")
+        table.add_column("Prompt", style="green", justify="right")
+        table.add_column("Cached", style="blue", justify="right")
+        table.add_column("Response", style="magenta", justify="right")
+        table.add_column("Prompt / Call", style="yellow", justify="right")
+        table.add_column("Response / Call", style="yellow", justify="right")
+
+        table.add_row(
+            str(stats['calls']),str(stats['prompt_tokens']),f"{stats['cached_tokens']} ({stats['cached_rate']:.1%})",
+            str(stats['response_tokens']),f"{stats['prompt_per_call']:.1f}",f"{stats['response_per_call']:.1f}"
+        )
+
+        rprint(table)
+
+
+    @staticmethod
+    def display_stats(summary):
+        if summary is None:
+            rprint("[bold red]📭 No tracked history in that date range.[/bold red]")
+            return
+
+        rprint(
+            f"[bold green]📊 {summary['since']} → {summary['until']}[/bold green] "
+            f"[cyan]{summary['total']} tasks on {summary['active_days']} of {summary['days']} days[/cyan] "
+            f"[magenta]streak {summary['streak']['current']} (longest {summary['streak']['longest']})[/magenta]"
+        )
+
+        distribution = summary['distribution']
+        table = Table(title="🗂️ Categories by Difficulty", show_lines=True)
+        table.add_column("Category", style="bold green")
+        for difficulty in distribution['difficulties']:
+            table.add_column(str(difficulty), style="cyan", justify="right")
+        table.add_column("Total", style="yellow", justify="right")
+        table.add_column("Share", style="magenta", justify="right")
+        for row in distribution['rows']:
+            table.add_row(str(row['category']),*[str(count) for count in row['counts']],str(row['total']),f"{row['total']/summary['total']:.1%}")
+        rprint(table)
+
+        table = Table(title="📈 Rolling Counts", show_lines=True)
+        table.add_column("Window", style="bold green")
+        table.add_column("Latest", style="cyan", justify="right")
+        table.add_column("Average", style="yellow", justify="right")
+        table.add_column("Best", style="magenta", justify="right")
+        table.add_column("Best Ending", style="blue")
+        for rolling in summary['rolling']:
+            table.add_row(f"{rolling['window']} days",str(rolling['latest']),f"{rolling['average']:.1f}",str(rolling['best']),rolling['best_end'])
+        rprint(table)
+
+        table = Table(title="📅 Weekdays", show_lines=True)
+        table.add_column("Day", style="bold green")
+        table.add_column("Tasks", style="cyan", justify="right")
+        table.add_column("Share", style="magenta", justify="right")
+        table.add_column("Per Day", style="yellow", justify="right")
+        for weekday in summary['weekdays']:
+            table.add_row(weekday['day'],str(weekday['count']),f"{weekday['share']:.1%}",f"{weekday['average']:.2f}")
+        rprint(table)
+
+        table = Table(title="📋 Lists", show_lines=True)
+        table.add_column("List", style="bold green")
+        table.add_column("Tasks", style="cyan", justify="right")
+        table.add_column("Current Streak", style="magenta", justify="right")
+        table.add_column("Longest Streak", style="magenta", justify="right")
+        table.add_column("Last Day", style="blue")
+        for entry in summary['lists']:
+            table.add_row(entry['list'],str(entry['count']),str(entry['current']),str(entry['longest']),entry['last'] or "")
+        rprint(table)